@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -11,6 +13,61 @@ class Settings(BaseSettings):
   access_token_expire_minutes: int
   algorithm: str
   database_url: str
+  # Use the asyncio engine (psycopg 3) and async route handlers instead of the threadpool ones
+  db_async: bool = False
+  # Connection pool, per gunicorn worker and per engine
+  db_pool_size: int = 5
+  db_max_overflow: int = 10
+  db_pool_timeout: float = 30
+  db_pool_recycle: int = 1800
+  db_pool_pre_ping: bool = True
+  # Size of anyio's default thread limiter. It caps all sync work of a worker, not only the
+  # handlers waiting on a connection: streamed /export bodies and in-thread hashing as well.
+  # Defaults to db_pool_size + db_max_overflow, never below anyio's own default of 40
+  threadpool_size: int | None = None
+  # Read replicas as database URLs, read-only handlers are spread over them when set
+  db_replica_urls: list[str] = []
+  # Seconds a client keeps reading from the primary after one of its own writes
+  read_your_writes_seconds: float = 5.0
+  # Per-worker cache of feed pages, a TTL of 0 disables it
+  feed_cache_size: int = 1024
+  feed_cache_ttl: float = 5.0
+  # Per-worker cache of authenticated users and decoded tokens
+  auth_cache_size: int = 4096
+  auth_cache_ttl: float = 60.0
+  # Trending ranking: posts kept, seconds between background refreshes and how fast votes age
+  trending_size: int = 500
+  trending_refresh_seconds: float = 60.0
+  trending_gravity: float = 1.8
+  # argon2 costs, see `python -m app.utils.hashing` to calibrate them for the host
+  argon2_time_cost: int = 3
+  argon2_memory_cost: int = 65536
+  argon2_parallelism: int = 4
+  # Processes hashing passwords for each worker, 0 hashes in the request thread instead
+  hash_workers: int = 1
+  # Hashes running or queued per worker before requests are turned away with a 503
+  hash_queue_depth: int = 8
+  # Statements slower than this are logged with the types of their parameters, 0 logs none
+  slow_query_ms: float = 200.0
+  # A statement run this many times in one request is logged as a likely N+1, 0 disables the check
+  n_plus_one_threshold: int = 10
+  # Fraction of requests profiled at random, on top of those sent with an X-Profile header
+  profile_sample_rate: float = 0.0
+  # Profiles kept on disk, shared by the workers of a host
+  profile_keep: int = 50
+  profile_dir: str = os.path.join(tempfile.gettempdir(), "fastapi-profiles")
+  # Readiness: seconds between the background database checks and how long one may take
+  health_check_interval: float = 5.0
+  health_check_timeout: float = 2.0
+  # Failed checks in a row before a worker reports itself not ready
+  health_failure_threshold: int = 3
+  # Logging: root level and per-logger overrides, e.g. LOG_LEVELS='{"app.utils.query_stats": "INFO"}'
+  log_level: str = "INFO"
+  log_levels: dict[str, str] = {}
+  # Records waiting for the log writer thread, further ones are dropped rather than block a request
+  log_queue_size: int = 10000
+  # Shared secret expected in the X-Admin-Token header, admin endpoints are disabled when unset
+  admin_token: str | None = None
 
   model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,6 +1,15 @@
+import itertools
 from urllib.parse import quote_plus
+from fastapi import Depends, Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from .config import settings
+from .utils.pool_metrics import MeteredQueuePool, MeteredAsyncQueuePool
+from .utils.query_stats import instrument_engine
+from .utils.read_your_writes import record_commit, written_recently
 
 password = quote_plus(settings.db_password)
 user = settings.db_user
@@ -8,13 +17,97 @@ host = settings.db_host
 port = settings.db_port
 db = settings.db_name
 DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/{db}"
+# psycopg 3 provides the asyncio driver used when settings.db_async is enabled
+ASYNC_DATABASE_URL = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 # DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
+pool_options = {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_recycle": settings.db_pool_recycle,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+}
+# Transactions on replicas are opened READ ONLY, a misrouted write fails instead of diverging
+replica_options = {**pool_options, "execution_options": {"postgresql_readonly": True}}
+
+engine = create_engine(DATABASE_URL, poolclass=MeteredQueuePool, **pool_options)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=MeteredAsyncQueuePool, **pool_options)
+
+replica_engines = [
+    create_engine(url, poolclass=MeteredQueuePool, **replica_options)
+    for url in settings.db_replica_urls
+]
+async_replica_engines = [
+    create_async_engine(make_url(url).set(drivername="postgresql+psycopg"), poolclass=MeteredAsyncQueuePool, **replica_options)
+    for url in settings.db_replica_urls
+]
+_replica_counter = itertools.count()
+
+for _engine in [engine, *replica_engines]:
+    instrument_engine(_engine)
+for _engine in [async_engine, *async_replica_engines]:
+    instrument_engine(_engine.sync_engine)
+
+
+@event.listens_for(Session, "after_commit")
+def _flag_commit(session):
+    # Fires for AsyncSession commits too, through their sync_session
+    record_commit()
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    # expire_on_commit=False so attributes can still be read after commit without implicit IO
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+def _use_replica(request: Request) -> bool:
+    # Only safe methods: write requests resolve the current user with the data they are about to change
+    return (
+        bool(replica_engines)
+        and request.method in ("GET", "HEAD")
+        and not written_recently(request.headers, request.cookies)
+    )
+
+def feed_cache_access(request: Request) -> tuple[bool, bool]:
+    """
+    Whether a read handler may (read, fill) the per-worker feed cache. Clients in their
+    read-your-writes window skip it: other workers still cache pages from before their write.
+    Pages read from a replica are not stored, they may predate the write the cache was cleared for.
+    """
+    if written_recently(request.headers, request.cookies):
+        return False, False
+    return True, not _use_replica(request)
+
+def get_read_session(request: Request, session: Session = Depends(get_session)):
+    """
+    Session for read-only handlers, served by a replica when one is configured.
+    Falls back to the primary session for writes and during the read-your-writes window.
+    """
+    if not _use_replica(request):
+        yield session
+        return
+    with Session(replica_engines[next(_replica_counter) % len(replica_engines)]) as replica_session:
+        yield replica_session
+
+async def get_async_read_session(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Async counterpart of get_read_session."""
+    if not _use_replica(request):
+        yield session
+        return
+    async with AsyncSession(async_replica_engines[next(_replica_counter) % len(async_replica_engines)], expire_on_commit=False) as replica_session:
+        yield replica_session
+
+def pool_metrics() -> dict:
+    """Current pool usage and checkout wait counters of the engines serving requests."""
+    engines = async_replica_engines if settings.db_async else replica_engines
+    metrics = {"primary": (async_engine if settings.db_async else engine).pool.metrics()}
+    for index, replica in enumerate(engines):
+        metrics[f"replica-{index}"] = replica.pool.metrics()
+    return metrics
+
 def  create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(engine)
@@ -1,23 +1,59 @@
-from fastapi import FastAPI, HTTPException, status
-from sqlalchemy import text
+import asyncio
+from fastapi import FastAPI, Response, status
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from .utils.dependencies import SessionDep
-from .routes.post_routes import router as post_router
-from .routes.users_routes import router as user_router
-from .routes.auth_routes import router as auth_router
-from .routes.votes_routes import router as vote_router
+from .config import settings
+from .database import async_engine, pool_metrics
+from .utils.hashing import shutdown_hashers
+from .utils.trending import refresh_trending_periodically
+from .utils.health import db_health, check_health_periodically
+from .utils.pagination import NEXT_CURSOR_HEADER
+from .utils.metrics import MetricsMiddleware, render_metrics
+from .utils.query_stats import QueryStatsMiddleware
+from .utils.profiling import ProfilingMiddleware
+from .utils.read_your_writes import READ_YOUR_WRITES_HEADER, ReadYourWritesMiddleware
+from .utils.log import REQUEST_ID_HEADER, RequestIdMiddleware, setup_logging, stop_logging
+from .routes.admin_routes import router as admin_router
+
+if settings.db_async:
+    # Handlers await the database instead of occupying a threadpool thread per request
+    from .routes.async_post_routes import router as post_router
+    from .routes.async_users_routes import router as user_router
+    from .routes.async_auth_routes import router as auth_router
+    from .routes.async_votes_routes import router as vote_router
+else:
+    from .routes.post_routes import router as post_router
+    from .routes.users_routes import router as user_router
+    from .routes.auth_routes import router as auth_router
+    from .routes.votes_routes import router as vote_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     # create_db_and_tables()
+    setup_logging()
+    # Enough threads for every connection sync handlers can get. The limiter is shared with all
+    # other sync work, so it is never shrunk below anyio's default, see settings.threadpool_size
+    to_thread.current_default_thread_limiter().total_tokens = (
+        settings.threadpool_size or max(40, settings.db_pool_size + settings.db_max_overflow)
+    )
+    trending_task = asyncio.create_task(refresh_trending_periodically())
+    health_task = asyncio.create_task(check_health_periodically())
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    trending_task.cancel()
+    health_task.cancel()
+    await async_engine.dispose()
+    # Waits for the hashes still running, off the event loop
+    await to_thread.run_sync(shutdown_hashers)
+    stop_logging()
 
-app = FastAPI(lifespan=lifespan)
+# orjson encodes the responses of handlers that do not serialize their own, see utils/responses.py
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,22 +61,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, READ_YOUR_WRITES_HEADER],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Added last so it wraps everything else and whatever they log carries the request id
+app.add_middleware(RequestIdMiddleware)
 
 # ---------------------------A-
 # FastAPI Endpoints
 # ----------------------------
 
+@app.get("/health/live")
+async def liveness():
+    """
+    The worker is up and its event loop responsive. Touches nothing else, a slow database
+    must not get workers restarted.
+    """
+    return {"status": "alive"}
+
 @app.get("/health")
-def health_check(session: SessionDep):
-    try:
-        session.exec(text('SELECT 1'))  # lightweight DB check
-        return {"status": "healthy"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Database connection failed: {str(e)}"
-        )
+@app.get("/health/ready")
+async def readiness():
+    """
+    Result of the last background database check, with this worker's pool usage. Served from
+    memory: probes take no pool connection and no threadpool thread. 503 until the first check
+    passes, while checks fail and when they have stopped coming in.
+    """
+    body = {**db_health.snapshot(), "pools": pool_metrics()}
+    return ORJSONResponse(body, status_code=status.HTTP_200_OK if db_health.ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Request counts and latency histograms per route, in the Prometheus text format.
+    """
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 @app.get("/")
 def root():
@@ -54,4 +113,5 @@ def root():
 app.include_router(post_router, prefix="/api/posts", tags=["Posts"])
 app.include_router(user_router, prefix="/api/users", tags=["Users"])
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(vote_router, prefix="/api/vote", tags=["Vote"])
\ No newline at end of file
+app.include_router(vote_router, prefix="/api/vote", tags=["Vote"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
\ No newline at end of file
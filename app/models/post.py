@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
-from sqlalchemy import Column, Boolean, Float, DateTime, text
+from sqlalchemy import Column, Boolean, Float, DateTime, Integer, Index, func, text
 from sqlmodel import Field, SQLModel, Relationship
 from .votes import Vote
 
@@ -20,6 +20,12 @@ class PostBase(SQLModel):
   )
 class Post(PostBase, table=True):
   __tablename__ = "posts"
+  __table_args__ = (
+    # Backs the feed sorted by votes (vote_count DESC, id DESC)
+    Index("ix_posts_vote_count_id", "vote_count", "id"),
+    # Posts of an author newest first: user-posts, the user listing and its post counts
+    Index("ix_posts_author_id_id", "author_id", "id"),
+  )
   id: int | None = Field(default=None, primary_key=True, index=True)
   created_at: datetime | None = Field(
     default_factory=datetime.now, 
@@ -31,7 +37,24 @@ class Post(PostBase, table=True):
     sa_column=Column(DateTime(timezone=True), server_default=text("CURRENT_TIMESTAMP"))
     )
 
+  # Number of rows in votes for this post, maintained by create_vote in the same transaction
+  vote_count: int = Field(
+    default=0,
+    sa_column=Column(Integer, nullable=False, server_default=text("0"))
+    )
+
   author_id: int | None = Field(default=None, foreign_key="users.id", ondelete="CASCADE")
   author: Optional["User"] = Relationship(back_populates="posts")
 
   votes: list['Vote'] = Relationship(back_populates="post", cascade_delete=True)
+
+# Full-text search document over title and content. Queries must use this exact expression
+# (constants inlined, not bound) for Postgres to match it to the GIN index.
+SEARCH_CONFIG = text("'english'::regconfig")
+search_document = func.to_tsvector(
+  SEARCH_CONFIG,
+  Post.__table__.c.title.concat(text("' '")).concat(Post.__table__.c.content)
+)
+Index("ix_posts_search_document", search_document, postgresql_using="gin")
+# Trigram indexes for substring search (ILIKE) need the pg_trgm extension and are created
+# by migration 8e2b6c4d1f90 only.
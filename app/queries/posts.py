@@ -0,0 +1,232 @@
+from datetime import datetime
+from typing import Collection, Literal, Sequence
+from sqlalchemy import Float, cast, exists, func, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Bundle
+from sqlmodel import select
+
+from ..models.post import Post as PostModel, search_document, SEARCH_CONFIG
+from ..models.user import User as UserModel
+from ..models.votes import Vote as VoteModel
+from ..utils.pagination import encode_cursor, decode_cursor
+
+# Statements shared by the sync and async post routers
+
+FeedSort = Literal["recent", "votes", "relevance"]
+# substring (default): case-insensitive substring of title or content, served by the pg_trgm indexes
+# fulltext: words matched against title and content through the GIN index, ranked by relevance
+SearchMode = Literal["substring", "fulltext"]
+# Rows fetched per round trip of the export's server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Posts accepted by a single POST /batch
+MAX_BATCH_SIZE = 1000
+# Ids resolved by a single POST /lookup
+MAX_LOOKUP_IDS = 500
+# full: posts with their content, summary: an excerpt of the content instead
+PostView = Literal["full", "summary"]
+EXCERPT_LENGTH = 200
+# Relationships a client can ask to embed with ?include=
+PostInclude = Literal["author"]
+# Endpoints returning posts with their vote counts can also tell whether the viewer voted
+FeedInclude = Literal["author", "voted_by_me"]
+
+
+class _AuthorRecord(Bundle):
+    # None rather than a record of NULLs when the outer join found no author
+    def create_row_processor(self, query, procs, labels):
+        make_record = super().create_row_processor(query, procs, labels)
+
+        def proc(row):
+            record = make_record(row)
+            return None if record.id is None else record
+        return proc
+
+
+def post_record(include: Collection[FeedInclude] = (), view: PostView = "full") -> Bundle:
+    """
+    Read-only stand-in for the Post entity: the columns a response needs, returned as a plain
+    tuple-backed record instead of an instrumented Post added to the session's identity map.
+    Named Post so rows read the same either way (row.Post.id). The summary view reads only the
+    first EXCERPT_LENGTH characters of the content, as `excerpt`. An author (with include=author)
+    needs the join added by with_includes.
+    """
+    content = func.left(PostModel.content, EXCERPT_LENGTH).label("excerpt") if view == "summary" else PostModel.content
+    columns = [
+        PostModel.id,
+        PostModel.title,
+        content,
+        PostModel.published,
+        PostModel.rating,
+        PostModel.created_at,
+        PostModel.updated_at,
+        PostModel.author_id,
+    ]
+    if "author" in include:
+        columns.append(_AuthorRecord("author", UserModel.id, UserModel.email, UserModel.username))
+    return Bundle("Post", *columns)
+
+
+def with_includes(statement, include: Collection[FeedInclude], viewer_id: int | None = None):
+    """
+    Complete a statement selecting a post_record(include) with what `include` asks for, in the
+    same query: the author's row joined in, and for statements selecting posts with their votes
+    a `voted_by_me` column.
+    """
+    if "voted_by_me" in include:
+        # An index-only probe of the votes primary key (user_id, post_id) per row
+        voted = exists().where(VoteModel.user_id == viewer_id, VoteModel.post_id == PostModel.id)
+        statement = statement.add_columns(voted.label("voted_by_me"))
+    if "author" in include:
+        statement = statement.outerjoin(UserModel, UserModel.id == PostModel.author_id)
+    return statement
+
+
+def _search_condition(search: str, mode: SearchMode):
+    if mode == "substring":
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return or_(PostModel.title.ilike(pattern, escape="\\"), PostModel.content.ilike(pattern, escape="\\"))
+    return search_document.op("@@")(func.websearch_to_tsquery(SEARCH_CONFIG, search))
+
+
+def _search_rank(search: str):
+    # ts_rank is a real, read it as double precision so the value stored in a cursor compares
+    # exactly equal to the row it came from
+    return cast(func.ts_rank(search_document, func.websearch_to_tsquery(SEARCH_CONFIG, search)), Float(precision=53))
+
+
+def feed_statement(
+    limit: int,
+    offset: int,
+    search: str | None,
+    sort: FeedSort = "recent",
+    cursor: str | None = None,
+    search_mode: SearchMode = "substring",
+    post=PostModel,
+):
+    """
+    Page of posts with their vote counts, newest first, most voted first or, for a full-text
+    search, most relevant first. With a cursor the page starts right after the row it points to.
+    """
+    if sort == "relevance" and not (search and search_mode == "fulltext"):
+        sort = "recent"
+    statement = select(post, PostModel.vote_count.label("votes"))
+    if search:
+        statement = statement.filter(_search_condition(search, search_mode))
+    if sort == "relevance":
+        rank = _search_rank(search)
+        statement = statement.add_columns(rank.label("rank"))
+        if cursor:
+            position = decode_cursor(cursor, rank=float, id=int)
+            statement = statement.where(tuple_(rank, PostModel.id) < tuple_(position["rank"], position["id"]))
+        statement = statement.order_by(rank.desc(), PostModel.id.desc())
+    elif sort == "votes":
+        if cursor:
+            position = decode_cursor(cursor, votes=int, id=int)
+            statement = statement.where(tuple_(PostModel.vote_count, PostModel.id) < tuple_(position["votes"], position["id"]))
+        statement = statement.order_by(PostModel.vote_count.desc(), PostModel.id.desc())
+    else:
+        if cursor:
+            statement = statement.where(PostModel.id < decode_cursor(cursor, id=int)["id"])
+        statement = statement.order_by(PostModel.id.desc())
+    return statement.offset(offset).limit(limit)
+
+
+def post_statement(post_id: int, post=PostModel):
+    """A single post with its vote count."""
+    return select(post, PostModel.vote_count.label("votes")).where(PostModel.id == post_id)
+
+
+def posts_by_ids_statement(post_ids: Collection[int], post=PostModel):
+    """The posts among `post_ids` with their vote counts, in no particular order."""
+    return select(post, PostModel.vote_count.label("votes")).where(PostModel.id.in_(post_ids))
+
+
+def feed_next_cursor(rows: Sequence, limit: int, sort: FeedSort = "recent") -> str | None:
+    """Cursor for the page after `rows` of a feed_statement, None when this was the last page."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if sort == "relevance" and "rank" in last._fields:
+        return encode_cursor({"rank": last.rank, "id": last.Post.id})
+    if sort == "votes":
+        return encode_cursor({"votes": last.votes, "id": last.Post.id})
+    return encode_cursor({"id": last.Post.id})
+
+
+def user_posts_statement(
+    author_id: int,
+    limit: int,
+    offset: int,
+    search: str | None,
+    cursor: str | None = None,
+    search_mode: SearchMode = "substring",
+    post=PostModel,
+):
+    """Page of the posts written by `author_id`, newest first."""
+    statement = select(post).where(PostModel.author_id == author_id)
+    if search:
+        statement = statement.filter(_search_condition(search, search_mode))
+    if cursor:
+        statement = statement.where(PostModel.id < decode_cursor(cursor, id=int)["id"])
+    return statement.order_by(PostModel.id.desc()).offset(offset).limit(limit)
+
+
+def user_posts_next_cursor(posts: Sequence, limit: int) -> str | None:
+    if not posts or len(posts) < limit:
+        return None
+    return encode_cursor({"id": posts[-1].id})
+
+
+def export_statement(author_id: int | None = None, since: datetime | None = None, until: datetime | None = None):
+    """
+    Posts with their vote counts in id order, optionally by one author and created in
+    [since, until). Plain columns rather than Post objects, streamed EXPORT_BATCH_SIZE rows
+    at a time from a server-side cursor.
+    """
+    statement = select(
+        PostModel.id,
+        PostModel.title,
+        PostModel.content,
+        PostModel.published,
+        PostModel.rating,
+        PostModel.created_at,
+        PostModel.updated_at,
+        PostModel.author_id,
+        PostModel.vote_count.label("votes"),
+    )
+    if author_id is not None:
+        statement = statement.where(PostModel.author_id == author_id)
+    if since is not None:
+        statement = statement.where(PostModel.created_at >= since)
+    if until is not None:
+        statement = statement.where(PostModel.created_at < until)
+    return statement.order_by(PostModel.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def batch_insert_statement(posts: Sequence[dict]):
+    """
+    One multi-row INSERT for all of `posts`. Rows whose title is taken, by an existing post or
+    an earlier row of the batch, are skipped rather than failing the statement; the created rows
+    come back from RETURNING, in no particular order.
+    """
+    return (
+        insert(PostModel)
+        .values(list(posts))
+        .on_conflict_do_nothing(index_elements=[PostModel.title])
+        .returning(*PostModel.__table__.c)
+    )
+
+
+def trending_statement(size: int, gravity: float):
+    """
+    Ids of the `size` posts with the highest time-decayed score, votes / (age in hours + 2)^gravity,
+    best first. Posts without votes never trend, which keeps the scan on ix_posts_vote_count_id.
+    """
+    age_hours = func.extract("epoch", func.now() - PostModel.created_at) / 3600
+    score = PostModel.vote_count / func.power(age_hours + 2, gravity)
+    return (
+        select(PostModel.id)
+        .where(PostModel.vote_count > 0)
+        .order_by(score.desc(), PostModel.id.desc())
+        .limit(size)
+    )
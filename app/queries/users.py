@@ -0,0 +1,53 @@
+from typing import Sequence
+from sqlalchemy import func
+from sqlalchemy.orm import aliased, noload
+from sqlmodel import select
+
+from ..models.post import Post as PostModel
+from ..models.user import User as UserModel
+from ..utils.pagination import encode_cursor, decode_cursor
+
+# Statements shared by the sync and async user routers
+
+
+def users_statement(limit: int, cursor: str | None = None):
+    """Page of users in id order, each with the number of posts they wrote."""
+    post_count = (
+        select(func.count())
+        .where(PostModel.author_id == UserModel.id)
+        .correlate(UserModel)
+        .scalar_subquery()
+    )
+    statement = select(UserModel, post_count.label("post_count"))
+    if cursor:
+        statement = statement.where(UserModel.id > decode_cursor(cursor, id=int)["id"])
+    return statement.order_by(UserModel.id).limit(limit)
+
+
+def recent_posts_statement(author_ids: Sequence[int], per_author: int):
+    """
+    The `per_author` newest posts of each of `author_ids`, in one query. selectinload cannot
+    bound a collection per parent, so the posts are numbered per author and cut in SQL instead.
+    """
+    numbered = (
+        select(
+            PostModel,
+            func.row_number().over(partition_by=PostModel.author_id, order_by=PostModel.id.desc()).label("position"),
+        )
+        .where(PostModel.author_id.in_(author_ids))
+        .subquery()
+    )
+    post = aliased(PostModel, numbered)
+    return (
+        select(post)
+        .where(numbered.c.position <= per_author)
+        .order_by(numbered.c.author_id, numbered.c.position)
+        # The author is the user the posts are listed under
+        .options(noload(post.author))
+    )
+
+
+def users_next_cursor(rows: Sequence, limit: int) -> str | None:
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor({"id": rows[-1].User.id})
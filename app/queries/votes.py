@@ -0,0 +1,55 @@
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..models.post import Post as PostModel
+from ..models.votes import Vote as VoteModel
+
+# Posts.vote_count is a denormalized count of the votes rows; every statement that adds or
+# removes votes runs one of these in the same transaction.
+
+
+def toggle_vote(post_id: int, user_id: int, dir: int):
+    """
+    Add (dir=1) or remove (dir=0) a vote and move the post's count in a single statement.
+    Returns one row (author_id, changed, vote_count), or none if the post does not exist.
+    `changed` is 0 when the vote was already there (or not there to remove) and on the
+    author's own posts, which cannot be voted on; `vote_count` is then NULL.
+    """
+    target = select(PostModel.id, PostModel.author_id).where(PostModel.id == post_id).cte("target")
+    if dir == 1:
+        # ON CONFLICT instead of checking first, concurrent upvotes cannot both count
+        changed = (
+            insert(VoteModel)
+            .from_select(["user_id", "post_id"], select(literal(user_id), target.c.id).where(target.c.author_id != user_id))
+            .on_conflict_do_nothing()
+            .returning(VoteModel.post_id)
+            .cte("changed")
+        )
+    else:
+        changed = (
+            VoteModel.__table__.delete()
+            .where(VoteModel.user_id == user_id, VoteModel.post_id.in_(select(target.c.id).where(target.c.author_id != user_id)))
+            .returning(VoteModel.post_id)
+            .cte("changed")
+        )
+    counted = (
+        update(PostModel)
+        .where(PostModel.id.in_(select(changed.c.post_id)))
+        .values(vote_count=PostModel.vote_count + (1 if dir == 1 else -1))
+        .returning(PostModel.vote_count)
+        .cte("counted")
+    )
+    return select(
+        target.c.author_id,
+        select(func.count()).select_from(changed).scalar_subquery().label("changed"),
+        select(counted.c.vote_count).scalar_subquery().label("vote_count"),
+    )
+
+
+def discount_user_votes(user_id: int):
+    """Take the votes of a user about to be deleted out of the counts."""
+    return (
+        update(PostModel)
+        .where(PostModel.id.in_(select(VoteModel.post_id).where(VoteModel.user_id == user_id)))
+        .values(vote_count=PostModel.vote_count - 1)
+    )
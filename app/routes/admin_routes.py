@@ -0,0 +1,65 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+from anyio import to_thread
+
+from ..database import pool_metrics
+from ..utils.dependencies import require_admin
+from ..utils.cache import feed_cache, user_cache, token_cache
+from ..utils.profiling import profile_store
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/pool")
+async def get_pool_metrics():
+    """
+    Connection pool usage of this worker and the threadpool sync handlers run in.
+    Counters are per process, query each gunicorn worker to tune pool sizes.
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    return {
+        "pools": pool_metrics(),
+        "threadpool": {
+            "size": limiter.total_tokens,
+            "in_use": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+    }
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """
+    Hit ratio and size of this worker's in-process caches.
+    """
+    return {"feed": feed_cache.stats(), "users": user_cache.stats(), "tokens": token_cache.stats()}
+
+
+@router.get("/profiles")
+def list_profiles():
+    """
+    Stored request profiles, newest first. Send a request with an X-Profile header holding the
+    admin token to profile it, its X-Profile-Id response header is the id to look up here.
+    """
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: Literal["text", "pstats"] = "text",
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(default=50, ge=1, le=1000),
+):
+    """
+    A profile as a pstats text report, or as the raw pstats dump for snakeviz and friends.
+    """
+    if format == "pstats":
+        path = profile_store.path(profile_id)
+        if path is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+    report = profile_store.report(profile_id, sort, limit)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(report)
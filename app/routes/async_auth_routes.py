@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from ..utils.dependencies import AsyncSessionDep
+from ..models.user import User as UserModel
+from sqlmodel import select
+from ..schema.auth_schema import AuthResponse
+from ..utils.hashing import verify_password, offload_async
+from ..utils.oauth2 import create_access_token
+
+# Async version of auth_routes, mounted when settings.db_async is enabled.
+router = APIRouter()
+
+@router.post("/login", response_model=AuthResponse)
+async def login(session: AsyncSessionDep, user_credentials: OAuth2PasswordRequestForm = Depends()):
+
+    if not user_credentials.username or not user_credentials.password:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid credentials")
+
+    user = (await session.exec(select(UserModel).where(UserModel.email == user_credentials.username))).first()
+
+    # argon2 is CPU bound, keep it off the event loop and out of this process
+    if not user or not await offload_async(verify_password, user_credentials.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    access_token = create_access_token(data={"user_id": user.id})
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,338 @@
+import logging
+from fastapi import APIRouter, HTTPException, status, Request, Response, Depends, Query, Body
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from ..utils.oauth2 import get_current_user_async
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Union
+
+from ..models.post import Post as PostModel
+from ..models.user import User as UserModel
+from ..schema.schema import PostCreate, PostUpdate, PostResponse, PostWithVotesSchema, PostExport, PostBatchResponse, PostLookup, PostLookupResponse, PostSummary, PostSummaryWithVotesSchema
+from ..utils.dependencies import AsyncSessionDep, AsyncReadSessionDep
+from ..database import feed_cache_access
+from ..utils.pagination import NEXT_CURSOR_HEADER
+from ..utils.responses import JSONBytesResponse, dump_list
+from ..utils.cache import feed_cache
+from ..utils.trending import trending, refresh_trending_if_stale_async
+from ..queries.posts import FeedSort, SearchMode, PostInclude, FeedInclude, PostView, post_record, with_includes, feed_statement, feed_next_cursor, post_statement, posts_by_ids_statement, user_posts_statement, user_posts_next_cursor, export_statement, batch_insert_statement, MAX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Async versions of the handlers in post_routes, mounted when settings.db_async is enabled.
+# Relationships serialized in the responses are loaded eagerly: lazy loading would need IO
+# outside of an awaitable context once the handler has returned.
+router = APIRouter()
+
+@router.get("/", response_model=Union[List[PostWithVotesSchema], List[PostSummaryWithVotesSchema]])
+async def get_posts(
+    request: Request,
+    session: AsyncReadSessionDep,
+    current_user: UserModel=Depends(get_current_user_async),
+    limit: int=Query(default=100, le=100),
+    offset: int=Query(default=0),
+    search="",
+    search_mode: SearchMode = "substring",
+    sort: FeedSort = "recent",
+    cursor: Optional[str] = None,
+    include: List[FeedInclude] = Query(default=[]),
+    view: PostView = "full"
+    ):
+    """
+    Retrieve all blog posts.
+    Returns a page of posts, newest, most voted or (full-text searches) most relevant first.
+    Pass the X-Next-Cursor response header back as `cursor` to get the following page,
+    include=author to embed each post's author and include=voted_by_me to flag your own votes.
+    view=summary replaces the content of each post with a short excerpt.
+    """
+    statement = with_includes(feed_statement(limit, offset, search, sort, cursor, search_mode, post_record(include, view)), include, current_user.id)
+    # Pages flagging the viewer's votes are only valid for that viewer
+    viewer = current_user.id if "voted_by_me" in include else None
+    cache_key = ("feed", limit, offset, search, search_mode, sort, cursor, tuple(sorted(set(include))), viewer, view)
+    use_cache, fill_cache = feed_cache_access(request)
+    page = feed_cache.get(cache_key) if use_cache else None
+    if page is None:
+        generation = feed_cache.generation
+        try:
+            rows = (await session.exec(statement)).all()
+        except Exception:
+            logger.exception("Error fetching posts")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+        schema = PostSummaryWithVotesSchema if view == "summary" else PostWithVotesSchema
+        # Cached serialized, a hit is sent without touching pydantic at all
+        page = (dump_list(schema, rows), feed_next_cursor(rows, limit, sort))
+        if fill_cache:
+            feed_cache.set(cache_key, page, generation)
+    body, next_cursor = page
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONBytesResponse(body, headers=headers)
+
+@router.get("/user-posts", response_model=Union[List[PostResponse], List[PostSummary]])
+async def get_my_posts(
+    session: AsyncReadSessionDep,
+    current_user: UserModel = Depends(get_current_user_async),
+    limit: int= Query(default=100, le=100),
+    offset=0,
+    search: Optional[str]="",
+    search_mode: SearchMode = "substring",
+    cursor: Optional[str] = None,
+    include: List[PostInclude] = Query(default=[]),
+    view: PostView = "full"
+    ):
+    """
+    Retrieve all blog posts belonging to logged in user.
+    Returns a page of posts, newest first, with the X-Next-Cursor header set when more remain.
+    view=summary replaces the content of each post with a short excerpt.
+    """
+    statement = with_includes(user_posts_statement(current_user.id, limit, offset, search, cursor, search_mode, post_record(include, view)), include)
+    try:
+        posts = (await session.exec(statement)).all()
+    except Exception:
+        logger.exception("Error fetching posts")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    next_cursor = user_posts_next_cursor(posts, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    schema = PostSummary if view == "summary" else PostResponse
+    return JSONBytesResponse(dump_list(schema, posts), headers=headers)
+
+@router.get("/trending", response_model=List[PostWithVotesSchema])
+async def get_trending_posts(
+    session: AsyncReadSessionDep,
+    current_user: UserModel = Depends(get_current_user_async),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    include: List[FeedInclude] = Query(default=[])
+    ):
+    """
+    Retrieve the posts trending right now, by votes decayed with the age of the post.
+    The ranking is recomputed in the background every few seconds, only the page is read here.
+    """
+    # First request of this worker, or the background refresh is not keeping up
+    await refresh_trending_if_stale_async(session)
+    post_ids = trending.page(offset, limit)
+    if not post_ids:
+        return []
+    statement = with_includes(posts_by_ids_statement(post_ids, post_record(include)), include, current_user.id)
+    try:
+        rows = (await session.exec(statement)).all()
+    except Exception:
+        logger.exception("Error fetching posts")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    by_id = {row.Post.id: row for row in rows}
+    posts = [by_id[post_id] for post_id in post_ids if post_id in by_id]
+    return JSONBytesResponse(dump_list(PostWithVotesSchema, posts))
+
+@router.get("/export")
+async def export_posts(
+    session: AsyncReadSessionDep,
+    current_user: UserModel = Depends(get_current_user_async),
+    author_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+    ):
+    """
+    Stream posts with their vote counts as NDJSON, one post per line in id order.
+    Filter by author and/or creation date, `since` inclusive and `until` exclusive.
+    """
+    statement = export_statement(author_id, since, until)
+    # The request's session is closed before the body is sent, stream from a session of our own
+    return StreamingResponse(_export_lines_async(session.bind, statement), media_type="application/x-ndjson")
+
+@router.get("/{post_id}", response_model=PostWithVotesSchema)
+async def get_post(post_id: int, session: AsyncReadSessionDep, current_user: UserModel = Depends(get_current_user_async), include: List[FeedInclude] = Query(default=[])):
+    """
+    Get a post by its unique ID.
+    If the post exists, returns it; otherwise, raises a 404 error.
+    """
+    try:
+        statement = with_includes(post_statement(post_id, post_record(include)), include, current_user.id)
+        post = (await session.exec(statement)).first()
+    except Exception:
+        logger.exception("Error fetching post")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    if not post:
+        # Return 404 if not found
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id {post_id} not found")
+    return post
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=PostResponse)
+async def create_post(session: AsyncSessionDep, payload: PostCreate, current_user: UserModel = Depends(get_current_user_async)):
+    """
+    Create a new blog post with the given title and content.
+    Returns the created post with its ID and timestamps.
+    Raises a 500 error if there is a database error.
+    """
+    try:
+        # current_user may be a cached snapshot, link it by id rather than attaching it
+        extra_data = {'author_id': current_user.id}
+        post = PostModel.model_validate(payload, update=extra_data)
+        session.add(post)
+        await session.commit()
+        feed_cache.clear()
+        await session.refresh(post, ["id", "created_at", "updated_at", "published", "rating", "author"])
+    except Exception:
+        logger.exception("Error creating post")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    return post
+
+@router.post("/lookup", response_model=PostLookupResponse)
+async def lookup_posts(
+    payload: PostLookup,
+    session: AsyncReadSessionDep,
+    current_user: UserModel = Depends(get_current_user_async),
+    include: List[FeedInclude] = Query(default=[])
+    ):
+    """
+    Get many posts by id in one query, in the order the ids were given.
+    Ids with no post are listed in `missing` instead.
+    """
+    post_ids = list(dict.fromkeys(payload.ids))
+    statement = with_includes(posts_by_ids_statement(post_ids, post_record(include)), include, current_user.id)
+    try:
+        rows = (await session.exec(statement)).all()
+    except Exception:
+        logger.exception("Error fetching posts")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    by_id = {row.Post.id: row for row in rows}
+    return {
+        "posts": [by_id[post_id] for post_id in post_ids if post_id in by_id],
+        "missing": [post_id for post_id in post_ids if post_id not in by_id],
+    }
+
+@router.post("/batch", status_code=status.HTTP_201_CREATED, response_model=PostBatchResponse)
+async def create_posts(
+    session: AsyncSessionDep,
+    response: Response,
+    payload: List[PostCreate] = Body(min_length=1, max_length=MAX_BATCH_SIZE),
+    current_user: UserModel = Depends(get_current_user_async)
+    ):
+    """
+    Create up to MAX_BATCH_SIZE posts in one INSERT and one transaction.
+    Posts whose title is already taken are reported in `errors` by their position in the
+    request, the rest are created. When none was created the response is a 409 with the errors.
+    """
+    values = [{**post.model_dump(), "author_id": current_user.id} for post in payload]
+    try:
+        rows = (await session.exec(batch_insert_statement(values))).all()
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        logger.exception("Error creating posts")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    if rows:
+        feed_cache.clear()
+    created_by_title = {row.title: row for row in rows}
+    created, errors = [], []
+    for index, post in enumerate(payload):
+        # pop: of several posts with the same title in the batch only the first was inserted
+        row = created_by_title.pop(post.title, None)
+        if row is None:
+            errors.append({"index": index, "detail": f"Post with title {post.title!r} already exists"})
+        else:
+            created.append(PostResponse.model_validate(row))
+    if not created:
+        response.status_code = status.HTTP_409_CONFLICT
+    return {"created": created, "errors": errors}
+
+@router.get("/latest/recent", response_model=PostResponse)
+async def get_latest_post(request: Request, session: AsyncReadSessionDep, current_user: UserModel = Depends(get_current_user_async), include: List[PostInclude] = Query(default=[])):
+    """
+    Get the latest (most recently added) post.
+    If no posts exist, raises a 404 error.
+    """
+    cache_key = ("latest", tuple(sorted(set(include))))
+    use_cache, fill_cache = feed_cache_access(request)
+    post = feed_cache.get(cache_key) if use_cache else None
+    if post is None:
+        generation = feed_cache.generation
+        try:
+            statement = with_includes(select(post_record(include)).order_by(PostModel.created_at.desc()), include)
+            post = (await session.exec(statement)).first()
+        except Exception:
+            logger.exception("Error fetching posts")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+        if post:
+            post = PostResponse.model_validate(post)
+            if fill_cache:
+                feed_cache.set(cache_key, post, generation)
+
+    if not post:
+        # Handle the case where no posts exist
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No posts available")
+    return post
+
+
+@router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_post(post_id: int, session: AsyncSessionDep, current_user: UserModel = Depends(get_current_user_async)):
+    """
+    Delete a post by its unique ID.
+    If the post is not found, a 404 error is raised.
+    """
+    deleted_post = await session.get(PostModel, post_id)
+    if not deleted_post:
+        # Raise 404 if post doesn't exist
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id {post_id} not found")
+    if deleted_post.author_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to perform requested action")
+    try:
+        await session.delete(deleted_post)
+        await session.commit()
+        feed_cache.clear()
+    except Exception:
+        # Handle any database errors
+        await session.rollback()
+        logger.exception("Error deleting post")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.put("/{post_id}", response_model=PostResponse, status_code=status.HTTP_202_ACCEPTED)
+async def update_post(post_id: int, payload: PostUpdate, session: AsyncSessionDep, current_user: UserModel = Depends(get_current_user_async)):
+    """
+    Update an existing post by its unique ID using partial data.
+    Returns the updated post or a 404 error if not found.
+    """
+    try:
+        updated_post = await session.get(PostModel, post_id, options=[selectinload(PostModel.author)])
+        if not updated_post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Post with id {post_id} not found"
+            )
+
+        if updated_post.author_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to perform requested action"
+            )
+        update_data = payload.model_dump(exclude_unset=True)
+        update_data['updated_at'] = datetime.now().isoformat()
+
+        for field, value in update_data.items():
+            setattr(updated_post, field, value)
+        session.add(updated_post)
+        await session.commit()
+        feed_cache.clear()
+        await session.refresh(updated_post)
+    except HTTPException:
+        raise
+    except Exception:
+        # Handle any database errors
+        await session.rollback()
+        logger.exception("Error updating post")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error"
+        )
+    return updated_post
+
+
+async def _export_lines_async(bind, statement):
+    async with AsyncSession(bind) as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            yield "".join(PostExport.model_validate(row._mapping).model_dump_json() + "\n" for row in rows)
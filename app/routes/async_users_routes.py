@@ -0,0 +1,133 @@
+from fastapi import APIRouter, HTTPException, status, Response, Query
+from sqlmodel import select
+from sqlalchemy.orm import selectinload
+from collections import defaultdict
+from typing import List, Optional
+
+from ..models.user import User as UserModel
+from ..schema.schema import UserCreate, UserUpdate, UserResponseWithPosts, UserListResponse
+from ..utils.dependencies import AsyncSessionDep, AsyncReadSessionDep
+from ..utils.hashing import hash_password, offload_async
+from ..utils.cache import feed_cache, user_cache
+from ..queries.votes import discount_user_votes
+from ..queries.users import users_statement, recent_posts_statement, users_next_cursor
+from ..utils.pagination import NEXT_CURSOR_HEADER
+
+# Async versions of the handlers in users_routes, mounted when settings.db_async is enabled.
+router = APIRouter()
+
+@router.get("/health")
+async def users():
+    return {"message": "Hello from users"}
+
+@router.get("/", response_model=List[UserListResponse])
+async def get_users(
+    session: AsyncReadSessionDep,
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    posts_limit: int = Query(default=5, ge=0, le=50)
+    ):
+    """
+    Retrieve a page of users, oldest first, each with their `posts_limit` newest posts and post count.
+    Pass the X-Next-Cursor response header back as `cursor` to get the following page.
+    """
+    rows = (await session.exec(users_statement(limit, cursor))).all()
+    posts = defaultdict(list)
+    if rows and posts_limit:
+        for post in (await session.exec(recent_posts_statement([row.User.id for row in rows], posts_limit))).all():
+            posts[post.author_id].append(post)
+    next_cursor = users_next_cursor(rows, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    # Posts are passed in explicitly, reading user.posts would lazy load all of them
+    return [
+        UserListResponse.model_validate(row.User, update={"posts": posts[row.User.id], "post_count": row.post_count})
+        for row in rows
+    ]
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserResponseWithPosts)
+async def create_user(user: UserCreate, session: AsyncSessionDep):
+    """
+    Create a new user.
+    """
+    if (await session.exec(select(UserModel).where(UserModel.email == user.email))).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    if (await session.exec(select(UserModel).where(UserModel.username == user.username))).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    # argon2 is CPU bound, keep it off the event loop and out of this process
+    hash = await offload_async(hash_password, user.password)
+    extra_data = {"hashed_password": hash}
+    db_user = UserModel.model_validate(user, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user, ["id", "created_at", "updated_at", "posts"])
+    return db_user
+
+@router.get("/{user_id}", response_model=UserResponseWithPosts)
+async def get_user(user_id: int, session: AsyncReadSessionDep):
+    """
+    Get a user by their unique ID.
+    If the user exists, returns it; otherwise, raises a 404 error.
+    """
+    user = await session.get(UserModel, user_id, options=[selectinload(UserModel.posts)])
+    if not user:
+        # Return 404 if not found
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found")
+    return user
+
+@router.patch("/", response_model=UserResponseWithPosts)
+async def update_user(user: UserUpdate, session: AsyncSessionDep):
+    """
+    Update a user by their email.
+    If the user exists, updates it; otherwise, raises a 404 error.
+    """
+    statement = select(UserModel).where(UserModel.email == user.email).options(selectinload(UserModel.posts))
+    db_user = (await session.exec(statement)).first()
+
+    if not db_user:
+        # Return 404 if not found
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No user with email {user.email} found")
+    # Update the user
+    updated_data = user.model_dump(exclude_unset=True)
+    extra_data = {}
+    # Hash password if provided
+    if "password" in updated_data:
+        hash = await offload_async(hash_password, updated_data["password"])
+        extra_data = {"hashed_password": hash}
+
+    db_user.sqlmodel_update(updated_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    # Feed pages embed the post authors
+    feed_cache.clear()
+    user_cache.pop(db_user.id)
+    await session.refresh(db_user, ["updated_at", "posts"])
+
+    return db_user
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(user_id: int, session: AsyncSessionDep):
+    """
+    Delete a user by their unique ID.
+    If the user exists, deletes it; otherwise, raises a 404 error.
+    """
+    user = await session.get(UserModel, user_id)
+    if not user:
+        # Return 404 if not found
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found")
+
+    # The user's votes go with it, take them out of the posts' vote counts first
+    await session.exec(discount_user_votes(user_id))
+    await session.delete(user)
+    await session.commit()
+    feed_cache.clear()
+    user_cache.pop(user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
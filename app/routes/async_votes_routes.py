@@ -0,0 +1,33 @@
+from fastapi import HTTPException, Depends, APIRouter, status
+from ..utils.oauth2 import get_current_user_async
+from ..utils.dependencies import AsyncSessionDep
+from ..schema.schema import VoteBase
+from ..queries.votes import toggle_vote
+from ..utils.cache import feed_cache
+
+# Async version of votes_routes, mounted when settings.db_async is enabled.
+router = APIRouter()
+
+@router.post('/', status_code=status.HTTP_201_CREATED)
+async def create_vote(vote: VoteBase, session: AsyncSessionDep, current_user=Depends(get_current_user_async)):
+    if vote.dir not in [0, 1]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid vote direction. Must be 0 or 1")
+
+    # Existence, author check, vote insert/delete and count update in one round trip
+    result = (await session.exec(toggle_vote(vote.post_id, current_user.id, vote.dir))).first()
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    if result.author_id == current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot vote on your own post")
+
+    if not result.changed:
+        if vote.dir == 1:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You have already upvoted this post")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    await session.commit()
+    feed_cache.clear()
+    if vote.dir == 1:
+        return {"message": "Successfully upvoted post", "votes": result.vote_count}
+    return {"message": "Successfully downvoted post.", "votes": result.vote_count}
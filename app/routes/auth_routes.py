@@ -4,10 +4,11 @@ from ..utils.dependencies import SessionDep
 from ..models.user import User as UserModel
 from sqlmodel import select
 from ..schema.auth_schema import AuthResponse
-from ..utils.hashing import verify_password
+from ..utils.hashing import verify_password, offload
 from ..utils.oauth2 import create_access_token
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/login", response_model=AuthResponse)
 def login(session: SessionDep, user_credentials: OAuth2PasswordRequestForm = Depends()):
@@ -18,7 +19,7 @@ def login(session: SessionDep, user_credentials: OAuth2PasswordRequestForm = Dep
 
     user = session.exec(select(UserModel).where(UserModel.email == user_credentials.username)).first()
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not offload(verify_password, user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Invalid credentials",
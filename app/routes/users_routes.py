@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Response
+from fastapi import APIRouter, HTTPException, status, Response, Query
 from sqlmodel import select
-from typing import List
+from collections import defaultdict
+from typing import List, Optional
 
 from ..models.user import User as UserModel
-from ..schema.schema import UserCreate, UserUpdate, UserResponseWithPosts
-from ..utils.dependencies import SessionDep
-from ..utils.hashing import hash_password
+from ..schema.schema import UserCreate, UserUpdate, UserResponseWithPosts, UserListResponse
+from ..utils.dependencies import SessionDep, ReadSessionDep
+from ..utils.hashing import hash_password, offload
+from ..utils.cache import feed_cache, user_cache
+from ..queries.votes import discount_user_votes
+from ..queries.users import users_statement, recent_posts_statement, users_next_cursor
+from ..utils.pagination import NEXT_CURSOR_HEADER
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/health")
 def users():
@@ -17,14 +23,31 @@ def users():
     """
     return {"message": "Hello from users"}
 
-@router.get("/", response_model=List[UserResponseWithPosts])
-def get_users(session: SessionDep):
+@router.get("/", response_model=List[UserListResponse])
+def get_users(
+    session: ReadSessionDep,
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    posts_limit: int = Query(default=5, ge=0, le=50)
+    ):
     """
-    Retrieve all users.
-    Returns a list of all stored users.
+    Retrieve a page of users, oldest first, each with their `posts_limit` newest posts and post count.
+    Pass the X-Next-Cursor response header back as `cursor` to get the following page.
     """
-    users = session.exec(select(UserModel)).all()
-    return users
+    rows = session.exec(users_statement(limit, cursor)).all()
+    posts = defaultdict(list)
+    if rows and posts_limit:
+        for post in session.exec(recent_posts_statement([row.User.id for row in rows], posts_limit)).all():
+            posts[post.author_id].append(post)
+    next_cursor = users_next_cursor(rows, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    # Posts are passed in explicitly, reading user.posts would lazy load all of them
+    return [
+        UserListResponse.model_validate(row.User, update={"posts": posts[row.User.id], "post_count": row.post_count})
+        for row in rows
+    ]
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserResponseWithPosts)
 def create_user(user: UserCreate, session: SessionDep):
@@ -41,7 +64,7 @@ def create_user(user: UserCreate, session: SessionDep):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    hash = hash_password(user.password)
+    hash = offload(hash_password, user.password)
     extra_data = {"hashed_password": hash}
     db_user = UserModel.model_validate(user, update=extra_data)
     # db_user = UserModel(**user.model_dump(exclude_unset=True))
@@ -51,7 +74,7 @@ def create_user(user: UserCreate, session: SessionDep):
     return db_user
 
 @router.get("/{user_id}", response_model=UserResponseWithPosts)
-def get_user(user_id: int, session: SessionDep):
+def get_user(user_id: int, session: ReadSessionDep):
     """
     Get a user by their unique ID.
     If the user exists, returns it; otherwise, raises a 404 error.
@@ -81,12 +104,15 @@ def update_user(user: UserUpdate, session: SessionDep):
     # Hash password if provided
     if "password" in updated_data:
          password = updated_data["password"]
-         hash = hash_password(password)
+         hash = offload(hash_password, password)
          extra_data = {"hashed_password": hash}
     
     db_user.sqlmodel_update(updated_data, update=extra_data)
     session.add(db_user)
     session.commit()
+    # Feed pages embed the post authors
+    feed_cache.clear()
+    user_cache.pop(db_user.id)
     session.refresh(db_user)
     
     return db_user
@@ -103,6 +129,10 @@ def delete_user(user_id: int, session: SessionDep):
         # Return 404 if not found
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found")
     
+    # The user's votes go with it, take them out of the posts' vote counts first
+    session.exec(discount_user_votes(user_id))
     session.delete(user)
     session.commit()
+    feed_cache.clear()
+    user_cache.pop(user_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -1,44 +1,33 @@
 from fastapi import HTTPException, Depends, APIRouter, status
-from sqlmodel import select
 from ..utils.oauth2 import get_current_user
 from ..utils.dependencies import SessionDep
 from ..schema.schema import VoteBase
-from ..models.votes import Vote
-from ..models.post import Post as PostModel
+from ..queries.votes import toggle_vote
+from ..utils.cache import feed_cache
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post('/', status_code=status.HTTP_201_CREATED)
 def create_vote(vote: VoteBase, session: SessionDep, current_user=Depends(get_current_user)):
-    post = session.get(PostModel, vote.post_id)
-    if not post:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    
-    if post.author_id == current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot vote on your own post")
-    
     if vote.dir not in [0, 1]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid vote direction. Must be 0 or 1")
 
+    # Existence, author check, vote insert/delete and count update in one round trip
+    result = session.exec(toggle_vote(vote.post_id, current_user.id, vote.dir)).first()
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
-    statement = select(Vote).filter(Vote.post_id == vote.post_id, Vote.user_id == current_user.id)
+    if result.author_id == current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot vote on your own post")
 
-    result = session.exec(statement).first()
-    # if not result:
-    #     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    if (vote.dir == 1):
-        if result:
+    if not result.changed:
+        if vote.dir == 1:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You have already upvoted this post")
-        new_vote = Vote(user_id = current_user.id, post_id= vote.post_id)
-        session.add(new_vote)
-        session.commit()
-        session.refresh(new_vote)
-        return {"message": "Successfully upvoted post"}
-    else:
-        if not result:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-        session.delete(result)
-        session.commit()
-        return {"message": "Successfully downvoted post."}
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
-    
\ No newline at end of file
+    session.commit()
+    feed_cache.clear()
+    if vote.dir == 1:
+        return {"message": "Successfully upvoted post", "votes": result.vote_count}
+    return {"message": "Successfully downvoted post.", "votes": result.vote_count}
@@ -9,6 +9,7 @@ from pydantic import Field as PyField
 
 from app.models.post import PostBase
 from ..models.user import UserBase
+from ..queries.posts import MAX_LOOKUP_IDS
 from sqlmodel import SQLModel
 
 # Post Schema
@@ -22,9 +23,38 @@ class PostResponse(PostBase):
     author_id: int
     author: UserResponse | None = None
 
+class PostSummary(SQLModel):
+    # PostResponse with an excerpt in place of the content
+    id: int
+    title: str
+    excerpt: str
+    published: bool | None = True
+    rating: float | None = 0
+    created_at: datetime
+    updated_at: datetime
+    author_id: int
+    author: UserResponse | None = None
+
+class PostExport(PostBase):
+    # One line of the NDJSON export
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    author_id: int
+    votes: int
+
 class PostUpdate(PostBase):
     updated_at: datetime | None = Field(default=datetime.now().isoformat())
 
+class PostBatchError(SQLModel):
+    # Position of the failed post in the request body
+    index: int
+    detail: str
+
+class PostBatchResponse(SQLModel):
+    created: list[PostResponse]
+    errors: list[PostBatchError]
+
 # User Schema
 class UserCreate(UserBase):
     password: str = Field(min_length=8, max_length=128)
@@ -52,6 +82,25 @@ class PostResponseWithUser(PostResponse):
 class UserResponseWithPosts(UserResponse):
     posts: list[PostResponse] = []
 
+class UserListResponse(UserResponseWithPosts):
+    # All of the user's posts, `posts` only holds the most recent ones
+    post_count: int
+
 class PostWithVotesSchema(SQLModel):
     Post: PostResponse
     votes: int
+    # Only filled in with include=voted_by_me
+    voted_by_me: bool | None = None
+
+class PostSummaryWithVotesSchema(SQLModel):
+    Post: PostSummary
+    votes: int
+    voted_by_me: bool | None = None
+
+class PostLookup(SQLModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_LOOKUP_IDS)
+
+class PostLookupResponse(SQLModel):
+    # In the order of the requested ids, repeated ids only once
+    posts: list[PostWithVotesSchema]
+    missing: list[int]
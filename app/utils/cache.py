@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from ..config import settings
+
+
+class TTLCache:
+    """
+    Bounded in-process cache: least recently used entries are evicted once `maxsize` is reached
+    and entries expire `ttl` seconds after being stored. Safe to share between threadpool threads.
+
+    Every worker process has its own copy, so invalidation only reaches the worker that handled
+    the write; the TTL bounds how stale the other workers can be.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear(), see set()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None, ttl: float | None = None):
+        """
+        Store `value`. Pass the `generation` read before computing the value: if the cache was
+        cleared or had a key popped in the meantime the value may predate the write that
+        invalidated it and is dropped.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Feed pages and the latest post, keyed on the query parameters. Cleared by every write that
+# changes what they show (posts created, updated or deleted, votes, user changes).
+feed_cache = TTLCache(settings.feed_cache_size, settings.feed_cache_ttl)
+
+# Authenticated users keyed by id, popped by update_user/delete_user. The cached instances are
+# detached snapshots shared between requests: read them, never add them to a session.
+user_cache = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl)
+
+# Decoded access tokens keyed by the token's sha256, each kept until the token expires.
+token_cache = TTLCache(settings.auth_cache_size, settings.access_token_expire_minutes * 60)
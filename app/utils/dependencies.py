@@ -1,8 +1,28 @@
 # app/dependencies.py
 
+import secrets
 from typing import Annotated
-from fastapi import Depends
+from fastapi import Depends, Header, HTTPException, status
 from sqlmodel import Session
-from ..database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..config import settings
+from ..database import get_session, get_async_session, get_read_session, get_async_read_session
 
 SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+# For handlers that only read, may be served by a replica
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_session)]
+
+
+def admin_token_matches(token: str | None) -> bool:
+    """Whether `token` is the configured admin token, always False when none is configured."""
+    return bool(settings.admin_token and token and secrets.compare_digest(token, settings.admin_token))
+
+
+def require_admin(x_admin_token: Annotated[str | None, Header()] = None):
+    """
+    Guard for operational endpoints, compares the X-Admin-Token header with settings.admin_token.
+    """
+    if not admin_token_matches(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to perform requested action")
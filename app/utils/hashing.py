@@ -1,8 +1,29 @@
 # Using argon2 for hashing passwords
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, VerificationError
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
 
-ph = PasswordHasher()
+ph = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
 
 def hash_password(password: str) -> str:
     """Hash a plain-text password using argon2."""
@@ -14,7 +35,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return ph.verify(hashed_password, plain_password)
     except (VerifyMismatchError, VerificationError) as e:
         # If the password does not match, an exception is raised
-        print(f"Password verification failed: {e}")
+        logger.debug("Password verification failed: %s", e)
         # Return False to indicate the password does not match
         return False
 
@@ -35,3 +56,120 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 # def verify_password(plain_password: str, hashed_password: str) -> bool:
 #     """Verify a plain-text password against a hashed password."""
 #     return pwd_context.verify(plain_password, hashed_password)
+
+
+# argon2 pins a core for every hash, run them in a few dedicated processes so a burst of
+# logins or sign ups cannot starve the threads and event loop serving everything else.
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork, forking a process that runs threads is not safe
+            _executor = ProcessPoolExecutor(settings.hash_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown_hashers(wait: bool = True):
+    """
+    Stop the hashing processes, called on application shutdown. With `wait` this blocks until
+    the running hashes are done, call it from a thread rather than the event loop.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+@contextmanager
+def _hash_slot():
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= settings.hash_queue_depth:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password operations in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+
+
+def _broken_pool() -> HTTPException:
+    # A hashing process died, start a fresh pool on the next call. Not waiting: this may run on
+    # the event loop, and the broken pool's processes are being terminated anyway
+    shutdown_hashers(wait=False)
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Password hashing unavailable", headers={"Retry-After": "1"})
+
+
+def offload(func, *args):
+    """
+    Run hash_password/verify_password in the hashing pool and wait for the result.
+    Raises a 503 once settings.hash_queue_depth operations are already pending.
+    """
+    with _hash_slot():
+        if settings.hash_workers <= 0:
+            return func(*args)
+        try:
+            return _get_executor().submit(func, *args).result()
+        except BrokenProcessPool:
+            raise _broken_pool()
+
+
+async def offload_async(func, *args):
+    """
+    Async counterpart of offload, awaits the hashing pool without blocking the event loop.
+    """
+    with _hash_slot():
+        if settings.hash_workers <= 0:
+            return await run_in_threadpool(func, *args)
+        try:
+            return await asyncio.wrap_future(_get_executor().submit(func, *args))
+        except BrokenProcessPool:
+            raise _broken_pool()
+
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int) -> PasswordHasher:
+    """
+    Pick argon2 costs whose hash time on this machine is close to `target_ms`: the most memory
+    up to `max_memory_kib` that stays under target with a single pass, then as many passes as fit.
+    """
+    def timed(time_cost: int, memory_cost: int) -> float:
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        start = time.perf_counter()
+        hasher.hash("calibration password")
+        return (time.perf_counter() - start) * 1000
+
+    memory_cost = max_memory_kib
+    while memory_cost > 8 * parallelism and timed(1, memory_cost) > target_ms:
+        memory_cost //= 2
+    time_cost = 1
+    while timed(time_cost + 1, memory_cost) <= target_ms:
+        time_cost += 1
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate argon2 costs for this host and print the matching settings.")
+    parser.add_argument("--target-ms", type=float, default=250, help="hash latency to aim for (default: 250)")
+    parser.add_argument("--max-memory-kib", type=int, default=65536, help="upper bound for memory_cost (default: 65536)")
+    parser.add_argument("--parallelism", type=int, default=min(os.cpu_count() or 1, 4), help="argon2 lanes (default: cores, at most 4)")
+    args = parser.parse_args()
+
+    hasher = calibrate(args.target_ms, args.max_memory_kib, args.parallelism)
+    start = time.perf_counter()
+    hasher.hash("calibration password")
+    print(f"# {(time.perf_counter() - start) * 1000:.0f} ms per hash")
+    print(f"ARGON2_TIME_COST={hasher.time_cost}")
+    print(f"ARGON2_MEMORY_COST={hasher.memory_cost}")
+    print(f"ARGON2_PARALLELISM={hasher.parallelism}")
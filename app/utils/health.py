@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+import time
+
+from anyio import CapacityLimiter, fail_after, to_thread
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from ..config import settings
+from ..database import DATABASE_URL, ASYNC_DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealth:
+    """
+    Outcome of the last background database check. Probes read it from memory, so however often
+    load balancers ask, a worker only checks every `interval` seconds and never from a request.
+
+    A worker stays ready until `failure_threshold` checks in a row have failed: a single slow
+    check during a load peak, when every worker is slow at once, must not take them all out of
+    rotation together.
+    """
+
+    def __init__(self, interval: float, failure_threshold: int):
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, latency: float, error: BaseException | None = None):
+        with self._lock:
+            was_healthy = self._passed and self._failures == 0
+            self._checked_at = time.monotonic()
+            self._checked_at_wall = time.time()
+            self._latency = latency
+            self._error = error
+            self._failures = failures = self._failures + 1 if error else 0
+            self._passed = self._passed or error is None
+        # Only changes are logged, not every check
+        if failures == 1:
+            logger.warning("Database health check failed: %r", error)
+        elif failures == self.failure_threshold:
+            logger.error("Database health check failed %d times in a row, not ready: %r", failures, error)
+        elif not error and not was_healthy:
+            logger.info("Database health check passed in %.1f ms", latency * 1000)
+
+    @property
+    def stale(self) -> bool:
+        # The checker is stuck or gone, its last result no longer says anything
+        return self._checked_at is None or time.monotonic() - self._checked_at > 3 * self.interval
+
+    @property
+    def ready(self) -> bool:
+        # Never passed yet, failed too many times in a row, or no recent result at all
+        return self._passed and self._failures < self.failure_threshold and not self.stale
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            if self._checked_at is None:
+                return {"status": "starting"}
+            return {
+                "status": "healthy" if self.ready else "unhealthy",
+                "checked_at": self._checked_at_wall,
+                "age_seconds": round(time.monotonic() - self._checked_at, 3),
+                "latency_ms": round(self._latency * 1000, 3),
+                # Only the type, the message can carry hosts and users
+                "error": type(self._error).__name__ if self._error else None,
+                "consecutive_failures": self._failures,
+            }
+
+    def clear(self):
+        self._checked_at: float | None = None
+        self._checked_at_wall: float | None = None
+        self._latency = 0.0
+        self._error: BaseException | None = None
+        self._failures = 0
+        self._passed = False
+
+
+db_health = DatabaseHealth(settings.health_check_interval, settings.health_failure_threshold)
+
+# The checks get connections of their own: borrowing from the request pools, they would queue
+# behind request traffic exactly when it peaks and fail on every worker at once.
+health_engine = create_engine(DATABASE_URL, poolclass=NullPool)
+async_health_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+
+# A check stuck in a thread keeps its slot, the next one times out instead of stacking up threads.
+# Separate from the default limiter so the checks never wait behind request handlers.
+_check_limiter = CapacityLimiter(1)
+
+
+def _select_one(engine: Engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def check_database(engine: Engine = health_engine):
+    start = time.perf_counter()
+    try:
+        with fail_after(settings.health_check_timeout):
+            await to_thread.run_sync(_select_one, engine, limiter=_check_limiter, abandon_on_cancel=True)
+    except Exception as e:
+        db_health.record(time.perf_counter() - start, e)
+    else:
+        db_health.record(time.perf_counter() - start)
+
+
+async def check_database_async(engine: AsyncEngine = async_health_engine):
+    start = time.perf_counter()
+    try:
+        with fail_after(settings.health_check_timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        db_health.record(time.perf_counter() - start, e)
+    else:
+        db_health.record(time.perf_counter() - start)
+
+
+async def check_health_periodically():
+    """Background task started by the lifespan hook, one per worker."""
+    while True:
+        if settings.db_async:
+            await check_database_async()
+        else:
+            await check_database()
+        await asyncio.sleep(settings.health_check_interval)
@@ -0,0 +1,73 @@
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Requests that matched no route share one label, scanners must not be able to grow the series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests handled, by route template and response status.",
+    ["method", "route", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response, by route template.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and times them per route template (/api/posts/{post_id}, not the raw path).
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so responses (streamed ones included)
+    pass through untouched and the cost per request is a clock read and two metric updates.
+    The route is read from the scope after the app has run, where FastAPI's router left it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            LATENCY.labels(method, path).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, path, str(status_code)).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Metrics in the Prometheus text format with their content type.
+
+    Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR (see
+    gunicorn.conf.py) and whichever worker serves the scrape adds them all up. Without it,
+    as with a single uvicorn process, the metrics are this process's own.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
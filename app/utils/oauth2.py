@@ -1,11 +1,17 @@
+import hashlib
+import logging
+import time
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from ..schema.auth_schema import TokenData
-from ..utils.dependencies import SessionDep
+from ..utils.dependencies import SessionDep, AsyncSessionDep, ReadSessionDep, AsyncReadSessionDep
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from ..models.user import User as UserModel
 from ..config import settings
+from .cache import token_cache, user_cache
+
+logger = logging.getLogger(__name__)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -40,51 +46,107 @@ def verify_access_token(token: str, credentials_exception) -> TokenData:
   Returns:
       TokenData: An object containing the user ID extracted from the token.
   """
+  token_key = hashlib.sha256(token.encode()).digest()
+  token_data = token_cache.get(token_key)
+  if token_data is not None:
+    return token_data
   try:
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    print("payload", payload)
     user_id = payload.get("user_id")
     exp = payload.get("exp")
-    print("exp", exp)
     if user_id is None:
       raise credentials_exception
     
     if exp is None or datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(timezone.utc):
-      print("Token has expired")
+      logger.debug("Token has expired")
       raise HTTPException(
         status_code=status.HTTP_403_UNAUTHORIZED,
         detail="Token has expired",
         headers={"WWW-Authenticate": "Bearer"},
       )
-    return TokenData(id=user_id)
+    token_data = TokenData(id=user_id)
+    token_cache.set(token_key, token_data, ttl=exp - time.time())
+    return token_data
   except JWTError as e:
-    print(e)
+    logger.debug("Invalid token: %s", e)
     raise credentials_exception
 
 
-def get_current_user(session: SessionDep, token: str = Depends(oauth2_scheme)) -> UserModel:
+def get_current_user(session: ReadSessionDep, primary_session: SessionDep, token: str = Depends(oauth2_scheme)) -> UserModel:
   """
   Get the current user from the JWT token.
   Args:
       token (str): The JWT token to verify.
-      session (SessionDep): The database session dependency.
+      session (ReadSessionDep): The database session dependency, possibly on a replica.
+      primary_session (SessionDep): Primary session, only queried when the replica misses the user.
   Returns:
       UserModel: The user object corresponding to the token.
   Raises:
       HTTPException: If the token is invalid or the user is not found.
   """
   
-  credentials_exception = HTTPException(
-    status_code=status.HTTP_401_UNAUTHORIZED,
-    detail="Could not validate credentials",
-    headers={"WWW-Authenticate": "Bearer"},
-  )
+  credentials_exception = _credentials_exception()
 
   user_id = verify_access_token(token, credentials_exception).id
   if user_id is None:
     raise credentials_exception
+  user = user_cache.get(user_id)
+  if user is not None:
+    return user
+  generation = user_cache.generation
   user = session.get(UserModel, user_id)
+  if user is None and session is not primary_session:
+    # A replica may not have caught up with a user who just signed up
+    user = primary_session.get(UserModel, user_id)
   if user is None:
     raise credentials_exception
   
-  return user
\ No newline at end of file
+  return _cache_user(user, generation)
+
+
+async def get_current_user_async(session: AsyncReadSessionDep, primary_session: AsyncSessionDep, token: str = Depends(oauth2_scheme)) -> UserModel:
+  """
+  Async counterpart of get_current_user, used by the routers mounted when settings.db_async is on.
+  Args:
+      token (str): The JWT token to verify.
+      session (AsyncReadSessionDep): The async database session dependency, possibly on a replica.
+      primary_session (AsyncSessionDep): Primary session, only queried when the replica misses the user.
+  Returns:
+      UserModel: The user object corresponding to the token.
+  Raises:
+      HTTPException: If the token is invalid or the user is not found.
+  """
+  credentials_exception = _credentials_exception()
+
+  user_id = verify_access_token(token, credentials_exception).id
+  if user_id is None:
+    raise credentials_exception
+  user = user_cache.get(user_id)
+  if user is not None:
+    return user
+  generation = user_cache.generation
+  user = await session.get(UserModel, user_id)
+  if user is None and session is not primary_session:
+    user = await primary_session.get(UserModel, user_id)
+  if user is None:
+    raise credentials_exception
+
+  return _cache_user(user, generation)
+
+
+def _cache_user(user: UserModel, generation: int) -> UserModel:
+  """
+  Cache a detached copy of `user` so later requests skip the lookup. The copy is returned
+  even on the first request so handlers see the same kind of object either way.
+  """
+  snapshot = UserModel.model_validate(user.model_dump())
+  user_cache.set(snapshot.id, snapshot, generation)
+  return snapshot
+
+
+def _credentials_exception() -> HTTPException:
+  return HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+  )
@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException, status
+
+# Keyset pagination: the cursor carries the sort key of the last row of a page, so the next page
+# is a range condition on an index instead of an OFFSET that scans and discards earlier rows.
+# It is opaque to clients: urlsafe base64 of a small JSON object.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, **types: type) -> dict:
+    """
+    Decode a cursor produced by encode_cursor and check it holds a value of the given type
+    for every keyword, e.g. decode_cursor(cursor, id=int). Raises a 400 error for anything else.
+    """
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise invalid_cursor
+    if not isinstance(position, dict) or not all(_is_a(position.get(key), kind) for key, kind in types.items()):
+        raise invalid_cursor
+    return position
+
+
+def _is_a(value, kind: type) -> bool:
+    # JSON has a single number type, accept whole numbers for floats but never booleans
+    if kind is float:
+        return type(value) in (int, float)
+    return type(value) is kind
@@ -0,0 +1,77 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """
+    Checkout counters for a connection pool, kept for the lifetime of the worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+class _MeteredPoolMixin:
+    """
+    Times every checkout (queueing for a free slot, opening overflow connections and the pre-ping)
+    so pool pressure shows up as wait time rather than as unexplained request latency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def metrics(self) -> dict:
+        stats = self.stats
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # QueuePool reports unused capacity as negative overflow
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_time_total": round(stats.wait_time_total, 6),
+            "wait_time_avg": round(stats.wait_time_total / stats.checkouts, 6) if stats.checkouts else 0.0,
+            "wait_time_max": round(stats.wait_time_max, 6),
+        }
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
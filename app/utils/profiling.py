@@ -0,0 +1,204 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable
+
+import anyio
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from .dependencies import admin_token_matches
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+_PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class RequestProfile:
+    """
+    cProfile profilers of one request: one for the event loop and one per threadpool call made
+    by a ProfiledRoute, merged into a single report at the end.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self._profilers: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> cProfile.Profile:
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        profiler.enable()
+        return profiler
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+# Only set while a profiled request runs, everything else sees None and skips profiling
+_current: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+
+def _profiled(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        profiler = profile.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class for routers with sync handlers. They run in a threadpool thread the event loop's
+    profiler does not see, so the handler is profiled in its own thread when the request is.
+    The endpoint is wrapped before FastAPI sees it; functools.wraps keeps its signature, but
+    annotations are resolved in this module, so handlers must not use string annotations.
+    Dependencies are left alone, wrapping them would break dependency_overrides.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfileStore:
+    """
+    The newest `keep` profiles of all workers, as pstats dumps with a JSON summary next to them.
+    """
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, profile: RequestProfile, meta: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.stats().dump_stats(self.directory / f"{profile.id}.prof")
+        (self.directory / f"{profile.id}.json").write_text(json.dumps({"id": profile.id, **meta}))
+        for stale in self._summaries()[self.keep:]:
+            for path in (stale, stale.with_suffix(".prof")):
+                # Another worker may be pruning the same files
+                path.unlink(missing_ok=True)
+
+    def _summaries(self) -> list[Path]:
+        """Summary files, newest first."""
+        paths = []
+        for path in self.directory.glob("*.json"):
+            try:
+                paths.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(paths, reverse=True)]
+
+    def list(self) -> list[dict]:
+        profiles = []
+        if not self.directory.is_dir():
+            return profiles
+        for path in self._summaries():
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except FileNotFoundError:
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> Path | None:
+        """The pstats dump of a profile, None if unknown. Ids are checked, they end up in a path."""
+        if not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.prof"
+        return path if path.is_file() else None
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> str | None:
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(str(path), stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+profile_store = ProfileStore(settings.profile_dir, settings.profile_keep)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests sent with an X-Profile header holding the admin token, and a random
+    `profile_sample_rate` fraction of all requests. The profile id is returned in X-Profile-Id,
+    fetch the report from /api/admin/profiles/{id}.
+
+    Other requests cost a header lookup. One request per worker is profiled at a time: the event
+    loop's profiler also sees the requests running alongside it, and a thread holds only one
+    cProfile at a time.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+        self._busy = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        if settings.admin_token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return admin_token_matches(value.decode("latin-1"))
+        return bool(settings.profile_sample_rate) and random.random() < settings.profile_sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._busy or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile.id
+            await send(message)
+
+        self._busy = True
+        token = _current.set(profile)
+        start = time.perf_counter()
+        profiler = profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            _current.reset(token)
+            self._busy = False
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "created_at": time.time(),
+                "pid": os.getpid(),
+            }
+            await anyio.to_thread.run_sync(self.store.save, profile, meta)
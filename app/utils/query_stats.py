@@ -0,0 +1,134 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements run on behalf of one request and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+# Set by QueryStatsMiddleware for the duration of a request. Threadpool calls and the async
+# engine's greenlets run in a copy of the request's context, so they all record into the same
+# object; statements outside of a request (the trending refresh) are not counted.
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current.get()
+
+
+def parameter_shape(parameters):
+    """
+    The types of the bound parameters rather than their values, which may be passwords or
+    other user data that has no place in a log.
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+        return tuple(type(value).__name__ for value in parameters)
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if settings.slow_query_ms and duration * 1000 >= settings.slow_query_ms:
+        logger.warning(
+            "Slow query (%.1f ms): %s parameters=%s",
+            duration * 1000, statement, parameter_shape(parameters),
+        )
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements, drop their start time
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """
+    Time every statement `engine` runs. Pass `async_engine.sync_engine` for an async engine.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the statements each request runs and the time spent in them, reported in a
+    Server-Timing header. A statement repeated `n_plus_one_threshold` times in one request,
+    typically a lazy load in a loop, is logged with the route it came from.
+
+    Statements of a streamed body run after the headers are sent and only count toward the log.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and stats.count:
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        token = _current.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._check_repeats(scope, stats)
+
+    @staticmethod
+    def _check_repeats(scope: Scope, stats: QueryStats):
+        threshold = settings.n_plus_one_threshold
+        if not threshold or stats.count < threshold:
+            return
+        route = getattr(scope.get("route"), "path", scope["path"])
+        for statement, times in stats.statements.items():
+            if times >= threshold:
+                logger.warning(
+                    "Possible N+1 in %s %s: statement run %d times (%d queries in total): %s",
+                    scope["method"], route, times, stats.count, statement,
+                )
@@ -0,0 +1,108 @@
+import hashlib
+import hmac
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+# A client that committed a write gets a signed marker back, as a cookie and as a response header
+# for clients that do not keep cookies (they send it back in the same header). Whichever worker
+# serves its next reads sends them to the primary while the marker is younger than the window.
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+
+class _RequestWrites:
+    committed = False
+
+
+# Set by ReadYourWritesMiddleware, flagged by the after_commit listener in app.database
+_current: ContextVar[_RequestWrites | None] = ContextVar("request_writes", default=None)
+
+
+def record_commit():
+    writes = _current.get()
+    if writes is not None:
+        writes.committed = True
+
+
+def _token_user_id(authorization: str | None) -> int | None:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]).get("user_id")
+    except JWTError:
+        return None
+
+
+def _signature(user_id: int, until: int) -> str:
+    message = f"{user_id}.{until}".encode()
+    return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+
+def write_marker(user_id: int, until: int) -> str:
+    """Marker telling every worker `user_id` reads from the primary until `until` (unix ms)."""
+    return f"{user_id}.{until}.{_signature(user_id, until)}"
+
+
+def written_recently(headers: Headers, cookies: dict[str, str]) -> bool:
+    """
+    Whether the request carries a valid, unexpired marker for the user of its access token.
+    Keyed on the user rather than the token, so a refreshed token keeps reading its writes.
+    """
+    marker = headers.get(READ_YOUR_WRITES_HEADER) or cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not marker:
+        return False
+    try:
+        user_id, until, signature = marker.split(".")
+        user_id, until = int(user_id), int(until)
+    except ValueError:
+        return False
+    return (
+        until > time.time() * 1000
+        and hmac.compare_digest(signature, _signature(user_id, until))
+        and _token_user_id(headers.get("authorization")) == user_id
+    )
+
+
+class ReadYourWritesMiddleware:
+    """
+    Hands a write marker to authenticated clients whose request committed, see written_recently.
+    Only active with replicas configured, reads all go to the primary otherwise.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.db_replica_urls or settings.read_your_writes_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        writes = _RequestWrites()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and writes.committed:
+                user_id = _token_user_id(Headers(scope=scope).get("authorization"))
+                if user_id is not None:
+                    window = settings.read_your_writes_seconds
+                    marker = write_marker(user_id, int((time.time() + window) * 1000))
+                    cookie = SimpleCookie()
+                    cookie[READ_YOUR_WRITES_COOKIE] = marker
+                    cookie[READ_YOUR_WRITES_COOKIE].update({"max-age": int(window) + 1, "path": "/", "httponly": True, "samesite": "lax"})
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Set-Cookie", cookie.output(header="").strip())
+                    headers[READ_YOUR_WRITES_HEADER] = marker
+            await send(message)
+
+        token = _current.set(writes)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,33 @@
+from functools import cache
+from typing import Any, Sequence
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    """
+    A body already serialized to JSON, sent as is. Handlers returning it skip FastAPI's
+    response_model pass (dump to dict, validate again, encode); response_model then only
+    documents the endpoint.
+    """
+    media_type = "application/json"
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+@cache
+def _list_adapter(schema: type) -> TypeAdapter:
+    # Built once per schema, the serializer is compiled when the adapter is created
+    return TypeAdapter(list[schema])
+
+
+def dump_list(schema: type, rows: Sequence[Any]) -> bytes:
+    """
+    Validate `rows` (ORM objects or result rows) into `schema` and serialize them to a JSON array:
+    one validation pass over the whole list and one pass of pydantic-core's JSON serializer.
+    The result can be cached and sent repeatedly with JSONBytesResponse.
+    """
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Sequence
+
+from anyio import to_thread
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config import settings
+from ..database import engine, async_engine
+from ..queries.posts import trending_statement
+
+logger = logging.getLogger(__name__)
+
+
+class TrendingRanking:
+    """
+    The current trending post ids, best first. Rebuilt wholesale by refresh_trending so readers
+    only ever slice a list; the posts themselves are read fresh by id on every request.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._post_ids: list[int] = []
+        self._refreshed_at: float | None = None
+        self._lock = threading.Lock()
+        # Held while the ranking is being rebuilt, so it is rebuilt once however many ask
+        self.refresh_lock = threading.Lock()
+
+    @property
+    def stale(self) -> bool:
+        # Never refreshed, or the background task has missed a couple of refreshes
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > 2 * self.refresh_seconds
+
+    @property
+    def empty(self) -> bool:
+        return self._refreshed_at is None
+
+    def replace(self, post_ids: Sequence[int]):
+        with self._lock:
+            self._post_ids = list(post_ids)
+            self._refreshed_at = time.monotonic()
+
+    def page(self, offset: int, limit: int) -> list[int]:
+        return self._post_ids[offset:offset + limit]
+
+    def clear(self):
+        with self._lock:
+            self._post_ids = []
+            self._refreshed_at = None
+
+
+trending = TrendingRanking(settings.trending_refresh_seconds)
+
+
+def refresh_trending(session: Session):
+    trending.replace(session.exec(trending_statement(settings.trending_size, settings.trending_gravity)).all())
+
+
+async def refresh_trending_async(session: AsyncSession):
+    trending.replace((await session.exec(trending_statement(settings.trending_size, settings.trending_gravity))).all())
+
+
+async def _acquire_refresh_lock():
+    # Polled rather than waited on in a thread, a cancelled wait must not end up holding the lock
+    while not trending.refresh_lock.acquire(blocking=False):
+        await asyncio.sleep(0.01)
+
+
+def refresh_trending_if_stale(session: Session):
+    """
+    Rebuild a stale ranking from a request. Single flight: while one request rebuilds it the
+    others serve the previous ranking, and only wait for the rebuild when there is none yet.
+    """
+    if not trending.stale:
+        return
+    if not trending.refresh_lock.acquire(blocking=trending.empty):
+        return
+    try:
+        # Whoever held the lock may just have rebuilt it
+        if trending.stale:
+            refresh_trending(session)
+    finally:
+        trending.refresh_lock.release()
+
+
+async def refresh_trending_if_stale_async(session: AsyncSession):
+    """Async counterpart of refresh_trending_if_stale."""
+    if not trending.stale:
+        return
+    if not trending.refresh_lock.acquire(blocking=False):
+        if not trending.empty:
+            return
+        await _acquire_refresh_lock()
+    try:
+        if trending.stale:
+            await refresh_trending_async(session)
+    finally:
+        trending.refresh_lock.release()
+
+
+async def refresh_trending_periodically():
+    """Background task started by the lifespan hook, one per worker."""
+    def refresh_sync():
+        with trending.refresh_lock, Session(engine) as session:
+            refresh_trending(session)
+
+    while True:
+        try:
+            if settings.db_async:
+                await _acquire_refresh_lock()
+                try:
+                    async with AsyncSession(async_engine) as session:
+                        await refresh_trending_async(session)
+                finally:
+                    trending.refresh_lock.release()
+            else:
+                await to_thread.run_sync(refresh_sync)
+        except Exception:
+            logger.exception("Error refreshing trending posts")
+        await asyncio.sleep(settings.trending_refresh_seconds)
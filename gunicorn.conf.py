@@ -0,0 +1,23 @@
+# Picked up by gunicorn from the working directory, command line flags take precedence
+import os
+import shutil
+import tempfile
+
+from prometheus_client import multiprocess
+
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Workers write their metrics to files here so /metrics can add up all of them. It has to be in
+# the environment before the workers import prometheus_client, hence set here in the master.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fastapi-metrics"))
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
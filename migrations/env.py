@@ -31,6 +31,17 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 target_metadata = metadata
+
+# Indexes that depend on the pg_trgm extension exist in migrations only, keep autogenerate
+# from proposing to drop them
+MIGRATION_ONLY_INDEXES = {"ix_posts_title_trgm", "ix_posts_content_trgm"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "index" and reflected and name in MIGRATION_ONLY_INDEXES:
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -53,6 +64,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -76,7 +88,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,36 @@
+"""add vote_count to posts
+
+Revision ID: 5d0f3a9c7e21
+Revises: bc15a15c3d9c
+Create Date: 2026-10-18 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0f3a9c7e21'
+down_revision: Union[str, None] = 'bc15a15c3d9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('vote_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # Backfill from the existing votes
+    op.execute("""
+        UPDATE posts SET vote_count = counts.votes
+        FROM (SELECT post_id, count(*) AS votes FROM votes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+    """)
+    op.create_index('ix_posts_vote_count_id', 'posts', ['vote_count', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_vote_count_id', table_name='posts')
+    op.drop_column('posts', 'vote_count')
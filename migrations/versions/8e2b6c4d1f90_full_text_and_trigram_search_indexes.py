@@ -0,0 +1,38 @@
+"""full-text and trigram search indexes on posts
+
+Revision ID: 8e2b6c4d1f90
+Revises: 5d0f3a9c7e21
+Create Date: 2026-10-18 11:02:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2b6c4d1f90'
+down_revision: Union[str, None] = '5d0f3a9c7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps posts writable while the indexes build, it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        # Same expression as app.models.post.search_document
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_search_document ON posts "
+            "USING gin (to_tsvector('english'::regconfig, title || ' ' || content))"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_title_trgm ON posts USING gin (title gin_trgm_ops)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_content_trgm ON posts USING gin (content gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_posts_content_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_posts_title_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_posts_search_document")
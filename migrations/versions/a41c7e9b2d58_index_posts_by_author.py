@@ -0,0 +1,28 @@
+"""index posts by author
+
+Revision ID: a41c7e9b2d58
+Revises: 8e2b6c4d1f90
+Create Date: 2026-10-18 13:24:51.207334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9b2d58'
+down_revision: Union[str, None] = '8e2b6c4d1f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_author_id_id ON posts (author_id, id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_posts_author_id_id")
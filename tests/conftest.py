@@ -1,12 +1,23 @@
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from app.main import app
 from urllib.parse import quote_plus
 from sqlmodel import Session, create_engine, SQLModel
-from app.utils.dependencies import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.utils.dependencies import get_session, get_async_session
+from app.routes.async_post_routes import router as async_post_router
+from app.routes.async_users_routes import router as async_user_router
+from app.routes.async_auth_routes import router as async_auth_router
+from app.routes.async_votes_routes import router as async_vote_router
 from app.config import settings
 from app.utils.oauth2 import create_access_token
 from app.models.post import Post as PostModel
+from app.utils.cache import feed_cache, user_cache, token_cache
+from app.utils.trending import trending
+from app.utils.health import db_health
 from sqlmodel import select
 
 password = quote_plus(settings.db_password)
@@ -15,6 +26,7 @@ host = settings.db_host
 port = settings.db_port
 db = f"{settings.db_name}_test"
 DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/{db}"
+ASYNC_DATABASE_URL = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 
 # Conftest is a configuration file for pytest that sets up fixtures and configurations for testing.
 # It is automatically recognized by pytest and can be used to share fixtures across multiple test files.
@@ -66,6 +78,12 @@ def test_user2(client: TestClient):
 @pytest.fixture(name="session")
 def test_session():
     """Fixture to create a test database session."""
+    # Cached pages would outlive the tables they were read from
+    feed_cache.clear()
+    user_cache.clear()
+    token_cache.clear()
+    trending.clear()
+    db_health.clear()
     engine = create_engine(DATABASE_URL)
     SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
@@ -133,3 +151,36 @@ def test_posts(session: Session, test_user: dict, test_user2: dict):
 
     posts = session.exec(select(PostModel).order_by(PostModel.id.desc())).all()
     return posts
+
+
+@pytest.fixture(name="first_vote")
+def fixture_first_vote(authorized_client: TestClient, test_posts, test_user):
+    """Fixture to create a vote for the first post."""
+    post = next((post for post in test_posts if post.author_id != test_user['id']), None)
+    assert post is not None, "No post found for voting"
+    assert post.id is not None, "Post ID is None"
+    payload = {
+        "post_id": post.id,
+        "dir": 1
+    }
+    authorized_client.post("/api/vote/", json=payload)
+    return post
+
+
+@pytest.fixture(name="async_client")
+def async_test_client(session: Session):
+    """Client for the async routers, backed by an AsyncSession on the test database.
+    NullPool because every TestClient request runs on its own event loop."""
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            yield async_session
+
+    async_app = FastAPI()
+    async_app.include_router(async_post_router, prefix="/api/posts")
+    async_app.include_router(async_user_router, prefix="/api/users")
+    async_app.include_router(async_auth_router, prefix="/api/auth")
+    async_app.include_router(async_vote_router, prefix="/api/vote")
+    async_app.dependency_overrides[get_async_session] = get_async_session_override
+    yield TestClient(async_app)
@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from app.config import settings
+from app.utils.pool_metrics import MeteredQueuePool
+from app.utils.profiling import profile_store
+from .conftest import DATABASE_URL
+
+
+@pytest.fixture(name="admin_token")
+def admin_token(monkeypatch):
+    """Enable the admin endpoints with a known token."""
+    monkeypatch.setattr(settings, "admin_token", "admin-secret")
+    return "admin-secret"
+
+def test_admin_disabled_without_token(client: TestClient):
+    res = client.get("/api/admin/pool")
+    assert res.status_code == 403
+
+def test_admin_wrong_token(client: TestClient, admin_token):
+    res = client.get("/api/admin/pool", headers={"X-Admin-Token": "wrong"})
+    assert res.status_code == 403
+
+def test_admin_pool_metrics(client: TestClient, admin_token):
+    res = client.get("/api/admin/pool", headers={"X-Admin-Token": admin_token})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["pools"]["primary"]["size"] == settings.db_pool_size
+    assert data["threadpool"]["size"] > 0
+
+def test_metered_pool_counts_checkouts_and_timeouts():
+    engine = create_engine(DATABASE_URL, poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    with engine.connect():
+        metrics = engine.pool.metrics()
+        assert metrics["checked_out"] == 1
+        assert metrics["checkouts"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    metrics = engine.pool.metrics()
+    assert metrics["checked_out"] == 0
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_time_max"] >= 0.1
+    engine.dispose()
+    assert engine.pool.metrics()["timeouts"] == 1
+
+def test_admin_cache_stats(client: TestClient, admin_token):
+    res = client.get("/api/admin/cache", headers={"X-Admin-Token": admin_token})
+    assert res.status_code == 200
+    assert res.json()["feed"]["maxsize"] == settings.feed_cache_size
+
+@pytest.fixture(name="profiles")
+def profiles(monkeypatch, tmp_path):
+    """Keep the profiles of a test in its own directory."""
+    monkeypatch.setattr(profile_store, "directory", tmp_path)
+    return profile_store
+
+def test_profile_request(authorized_client: TestClient, test_posts, admin_token, profiles):
+    res = authorized_client.get("/api/posts/", headers={"X-Profile": admin_token})
+    assert res.status_code == 200
+    profile_id = res.headers["x-profile-id"]
+
+    listed = authorized_client.get("/api/admin/profiles", headers={"X-Admin-Token": admin_token}).json()
+    assert [(p["id"], p["route"], p["status"]) for p in listed] == [(profile_id, "/api/posts/", 200)]
+
+    report = authorized_client.get(f"/api/admin/profiles/{profile_id}", headers={"X-Admin-Token": admin_token})
+    assert report.status_code == 200
+    # The sync handler ran in a threadpool thread, its profile is merged in
+    assert "get_posts" in report.text
+
+    dump = authorized_client.get(f"/api/admin/profiles/{profile_id}?format=pstats", headers={"X-Admin-Token": admin_token})
+    assert dump.status_code == 200
+    assert dump.content == (profiles.directory / f"{profile_id}.prof").read_bytes()
+
+def test_profile_requires_admin_token(authorized_client: TestClient, test_posts, admin_token, profiles):
+    res = authorized_client.get("/api/posts/", headers={"X-Profile": "wrong"})
+    assert "x-profile-id" not in res.headers
+    assert profiles.list() == []
+
+def test_profile_sampled(client: TestClient, profiles, monkeypatch):
+    monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+    assert "x-profile-id" in client.get("/").headers
+    monkeypatch.setattr(settings, "profile_sample_rate", 0.0)
+    assert "x-profile-id" not in client.get("/").headers
+
+def test_profile_store_keeps_newest(client: TestClient, profiles, monkeypatch):
+    monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+    monkeypatch.setattr(profiles, "keep", 2)
+    ids = [client.get("/").headers["x-profile-id"] for _ in range(3)]
+    assert {p["id"] for p in profiles.list()} == set(ids[1:])
+    assert profiles.path(ids[0]) is None
+
+@pytest.mark.parametrize("profile_id", ["0" * 32, "../../etc/passwd"])
+def test_profile_not_found(client: TestClient, admin_token, profiles, profile_id):
+    res = client.get(f"/api/admin/profiles/{profile_id}", headers={"X-Admin-Token": admin_token})
+    assert res.status_code == 404
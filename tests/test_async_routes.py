@@ -0,0 +1,119 @@
+import json
+from fastapi.testclient import TestClient
+from app.schema.schema import PostResponse, UserResponse
+from app.utils.oauth2 import create_access_token
+
+
+def test_async_create_user(async_client: TestClient):
+    """Test creating a user through the async users router."""
+    res = async_client.post("/api/users/", json={"email": "async@email.com", "password": "Testing123"})
+    assert res.status_code == 201
+    new_user = UserResponse(**res.json())
+    assert new_user.email == "async@email.com"
+    assert res.json()["posts"] == []
+
+def test_async_login(async_client: TestClient, test_user):
+    """Test logging in through the async auth router."""
+    res = async_client.post(
+        "/api/auth/login/",
+        data={"username": test_user["email"], "password": test_user["password"]}
+    )
+    assert res.status_code == 200
+    assert "access_token" in res.json()
+
+def test_async_get_user_with_posts(async_client: TestClient, test_posts, test_user):
+    """Test the eagerly loaded posts of a user."""
+    res = async_client.get(f"/api/users/{test_user['id']}/")
+    assert res.status_code == 200
+    posts = res.json()["posts"]
+    assert len(posts) == len([post for post in test_posts if post.author_id == test_user["id"]])
+
+def test_async_get_posts(async_client: TestClient, test_posts, token):
+    """Test the feed from the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.get("/api/posts/?include=author")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data) == len(test_posts)
+    assert [post["Post"]["id"] for post in data] == [post.id for post in test_posts]
+    assert data[0]["Post"]["author"]["id"] == test_posts[0].author_id
+
+def test_async_create_update_delete_post(async_client: TestClient, test_user, token):
+    """Test the write path of the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.post("/api/posts/", json={"title": "Async post", "content": "Written without a thread."})
+    assert res.status_code == 201
+    post = PostResponse(**res.json())
+    assert post.author_id == test_user["id"]
+    assert post.author.email == test_user["email"]
+
+    res = async_client.put(f"/api/posts/{post.id}/", json={"title": "Async post edited", "content": "Still no thread."})
+    assert res.status_code == 202
+    assert res.json()["title"] == "Async post edited"
+
+    res = async_client.delete(f"/api/posts/{post.id}/")
+    assert res.status_code == 204
+
+def test_async_vote(async_client: TestClient, test_posts, test_user):
+    """Test upvoting and downvoting through the async votes router."""
+    token = create_access_token({"user_id": test_user["id"]})
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    post = next(post for post in test_posts if post.author_id != test_user["id"])
+    res = async_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    assert res.status_code == 201
+    res = async_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    assert res.status_code == 409
+    res = async_client.post("/api/vote/", json={"post_id": post.id, "dir": 0})
+    assert res.status_code == 201
+
+def test_async_get_users(async_client: TestClient, test_posts, test_user):
+    """Test the paginated user listing from the async users router."""
+    res = async_client.get("/api/users/?limit=1&posts_limit=1")
+    assert res.status_code == 200
+    users = res.json()
+    assert users[0]["id"] == test_user["id"]
+    assert users[0]["post_count"] == 2
+    assert len(users[0]["posts"]) == 1
+    assert "X-Next-Cursor" in res.headers
+    assert async_client.get("/api/users/?limit=0").status_code == 422
+
+def test_async_export_posts(async_client: TestClient, test_posts, token):
+    """Test the NDJSON export from the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.get("/api/posts/export")
+    assert res.status_code == 200
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == sorted(post.id for post in test_posts)
+
+def test_async_create_posts_batch(async_client: TestClient, test_posts, token):
+    """Test batch creation through the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    payload = [{"title": "Async batch post", "content": "Created in a batch."}, {"title": test_posts[0].title, "content": "Taken."}]
+    res = async_client.post("/api/posts/batch", json=payload)
+    assert res.status_code == 201
+    assert [post["title"] for post in res.json()["created"]] == ["Async batch post"]
+    assert res.json()["errors"][0]["index"] == 1
+
+def test_async_lookup_posts(async_client: TestClient, test_posts, token):
+    """Test the multi-get from the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.post("/api/posts/lookup?include=author", json={"ids": [test_posts[1].id, 99999999]})
+    assert res.status_code == 200
+    assert res.json()["posts"][0]["Post"]["author"]["id"] == test_posts[1].author_id
+    assert res.json()["missing"] == [99999999]
+
+def test_async_trending_posts(async_client: TestClient, test_posts, token):
+    """Test the trending endpoint of the async posts router."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.get("/api/posts/trending")
+    assert res.status_code == 200
+    assert res.json() == []
+
+def test_async_get_posts_summary_view(async_client: TestClient, test_posts, token):
+    """Test the summary view of the async feed and user posts."""
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+    res = async_client.get("/api/posts/?view=summary")
+    assert res.status_code == 200
+    assert all("content" not in post["Post"] and post["Post"]["excerpt"] for post in res.json())
+    res = async_client.get("/api/posts/user-posts?view=summary")
+    assert res.status_code == 200
+    assert all("content" not in post and post["excerpt"] for post in res.json())
@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.utils.cache import TTLCache, feed_cache, user_cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_ttl_cache_drops_values_computed_before_clear():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation
+    cache.clear()
+    cache.set("a", 1, generation)
+    assert cache.get("a") is None
+
+def test_ttl_cache_disabled():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+def test_feed_served_from_cache(authorized_client: TestClient, test_posts):
+    first = authorized_client.get("/api/posts/?limit=2")
+    hits = feed_cache.hits
+    second = authorized_client.get("/api/posts/?limit=2")
+    assert feed_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+def test_feed_cache_cleared_by_new_post(authorized_client: TestClient, test_posts):
+    authorized_client.get("/api/posts/")
+    authorized_client.get("/api/posts/latest/recent")
+    res = authorized_client.post("/api/posts/", json={"title": "Fresh post", "content": "Just in"})
+    assert res.status_code == 201
+    posts = authorized_client.get("/api/posts/").json()
+    assert len(posts) == len(test_posts) + 1
+    assert authorized_client.get("/api/posts/latest/recent").json()["title"] == "Fresh post"
+
+def test_feed_cache_cleared_by_vote(authorized_client: TestClient, test_posts, test_user):
+    post = next(post for post in test_posts if post.author_id != test_user['id'])
+    authorized_client.get("/api/posts/?sort=votes")
+    authorized_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    posts = authorized_client.get("/api/posts/?sort=votes").json()
+    assert posts[0]["Post"]["id"] == post.id
+    assert posts[0]["votes"] == 1
+
+def test_cached_feed_read_runs_no_sql(authorized_client: TestClient, test_posts, session):
+    authorized_client.get("/api/posts/")
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(session.get_bind(), "before_cursor_execute", count)
+    try:
+        res = authorized_client.get("/api/posts/")
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count)
+    assert res.status_code == 200
+    assert statements == []
+
+def test_user_cache_popped_on_delete(authorized_client: TestClient, test_user):
+    authorized_client.get("/api/posts/")
+    assert user_cache.get(test_user['id']) is not None
+    res = authorized_client.delete(f"/api/users/{test_user['id']}")
+    assert res.status_code == 204
+    res = authorized_client.get("/api/posts/")
+    assert res.status_code == 401
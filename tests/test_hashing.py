@@ -0,0 +1,30 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.utils.hashing import calibrate, hash_password, offload, verify_password
+
+
+def test_offload_round_trip():
+    hashed = offload(hash_password, "Testing123")
+    assert offload(verify_password, "Testing123", hashed)
+    assert not offload(verify_password, "wrong password", hashed)
+
+def test_offload_rejects_when_queue_full(monkeypatch):
+    monkeypatch.setattr(settings, "hash_queue_depth", 0)
+    with pytest.raises(HTTPException) as exc_info:
+        offload(hash_password, "Testing123")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+def test_create_user_when_hashing_saturated(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "hash_queue_depth", 0)
+    res = client.post("/api/users/", json={"email": "busy@email.com", "password": "Testing123"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+def test_calibrate_stays_within_bounds():
+    # Nothing hashes in 0 ms, so this lands on the cheapest costs allowed
+    hasher = calibrate(target_ms=0, max_memory_kib=1024, parallelism=1)
+    assert hasher.time_cost == 1
+    assert hasher.memory_cost == 8
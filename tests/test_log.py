@@ -0,0 +1,50 @@
+import json
+import logging
+import queue
+import sys
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.utils.log import JSONFormatter, _RequestQueueHandler, request_id
+
+
+def test_request_id_generated(client: TestClient):
+    res = client.get("/")
+    assert len(res.headers["x-request-id"]) == 32
+
+def test_request_id_from_proxy(client: TestClient):
+    assert client.get("/", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+    # Ids that could forge log lines are replaced
+    assert client.get("/", headers={"X-Request-ID": 'x"\\n'}).headers["x-request-id"] != 'x"\\n'
+
+def test_queued_record_carries_request_id_as_json():
+    records = queue.Queue()
+    handler = _RequestQueueHandler(records)
+    logger = logging.getLogger("test_log")
+    token = request_id.set("req-1")
+    try:
+        handler.handle(logger.makeRecord("test_log", logging.INFO, __file__, 1, "created %s", ("post",), None, extra={"post_id": 7}))
+    finally:
+        request_id.reset(token)
+    entry = json.loads(JSONFormatter().format(records.get_nowait()))
+    assert entry["message"] == "created post"
+    assert entry["request_id"] == "req-1"
+    assert entry["post_id"] == 7
+    assert entry["level"] == "INFO"
+
+def test_exception_logged_with_traceback():
+    records = queue.Queue()
+    handler = _RequestQueueHandler(records)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test_log").makeRecord("test_log", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    handler.handle(record)
+    entry = json.loads(JSONFormatter().format(records.get_nowait()))
+    assert "ValueError: boom" in entry["exception"]
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _RequestQueueHandler(queue.Queue(1))
+    before = REGISTRY.get_sample_value("log_records_dropped_total")
+    for _ in range(3):
+        handler.handle(logging.makeLogRecord({"msg": "x"}))
+    assert REGISTRY.get_sample_value("log_records_dropped_total") == before + 2
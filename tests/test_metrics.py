@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+
+def requests_total(method: str, route: str, status: str) -> float:
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+def test_metrics_by_route_template(authorized_client: TestClient, test_posts):
+    before = requests_total("GET", "/api/posts/{post_id}", "200")
+    for post in test_posts[:2]:
+        assert authorized_client.get(f"/api/posts/{post.id}").status_code == 200
+    assert requests_total("GET", "/api/posts/{post_id}", "200") == before + 2
+
+    res = authorized_client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/posts/{post_id}"}' in res.text
+    # Raw paths never become labels
+    assert f'route="/api/posts/{test_posts[0].id}"' not in res.text
+
+@pytest.mark.parametrize("path, route, status", [
+    ("/api/posts/not-a-number", "/api/posts/{post_id}", "422"),
+    ("/wp-login.php", "unmatched", "404"),
+])
+def test_metrics_status_and_unmatched(authorized_client: TestClient, path, route, status):
+    before = requests_total("GET", route, status)
+    authorized_client.get(path)
+    assert requests_total("GET", route, status) == before + 1
@@ -1,6 +1,11 @@
 from app.schema.schema import PostResponse
 from fastapi.testclient import TestClient
 import pytest
+import json
+from datetime import timedelta
+from sqlalchemy import event
+from app.utils.oauth2 import create_access_token
+from app.utils.trending import trending
 
 def test_get_all_posts(authorized_client: TestClient, test_posts):
     res = authorized_client.get("/api/posts/")
@@ -184,4 +189,294 @@ def test_authorised_user_update_other_post(authorized_client: TestClient, test_p
     }
     res = authorized_client.put(f"/api/posts/{post_id}/", json=user_data)
     assert res.status_code == 403
-    assert res.json() == {'detail': 'Not authorized to perform requested action'}
\ No newline at end of file
+    assert res.json() == {'detail': 'Not authorized to perform requested action'}
+
+def test_get_posts_cursor_pagination(authorized_client: TestClient, test_posts):
+    """Test walking the feed with the X-Next-Cursor header."""
+    res = authorized_client.get("/api/posts/?limit=3")
+    assert res.status_code == 200
+    first_page = [post['Post']['id'] for post in res.json()]
+    cursor = res.headers["X-Next-Cursor"]
+    res = authorized_client.get(f"/api/posts/?limit=3&cursor={cursor}")
+    assert res.status_code == 200
+    second_page = [post['Post']['id'] for post in res.json()]
+    assert "X-Next-Cursor" not in res.headers
+    assert first_page + second_page == [post.id for post in test_posts]
+
+def test_get_posts_cursor_sorted_by_votes(authorized_client: TestClient, test_posts, test_user):
+    """Test that the cursor carries the vote count when sorting by votes."""
+    voted = [post for post in test_posts if post.author_id != test_user['id']][-1]
+    authorized_client.post("/api/vote/", json={"post_id": voted.id, "dir": 1})
+    res = authorized_client.get("/api/posts/?limit=1&sort=votes")
+    data = res.json()
+    assert data[0]['Post']['id'] == voted.id
+    assert data[0]['votes'] == 1
+    ids = [voted.id]
+    cursor = res.headers["X-Next-Cursor"]
+    while cursor:
+        res = authorized_client.get(f"/api/posts/?limit=1&sort=votes&cursor={cursor}")
+        ids += [post['Post']['id'] for post in res.json()]
+        cursor = res.headers.get("X-Next-Cursor")
+    assert ids == [voted.id] + [post.id for post in test_posts if post.id != voted.id]
+
+def test_get_my_posts_cursor_pagination(authorized_client: TestClient, test_posts, test_user):
+    res = authorized_client.get("/api/posts/user-posts/?limit=1")
+    cursor = res.headers["X-Next-Cursor"]
+    res = authorized_client.get(f"/api/posts/user-posts/?limit=1&cursor={cursor}")
+    expected = [post.id for post in test_posts if post.author_id == test_user["id"]]
+    assert [post['id'] for post in res.json()] == expected[1:2]
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "eyJpZCI6ImEifQ", "W10"])
+def test_get_posts_invalid_cursor(authorized_client: TestClient, cursor):
+    res = authorized_client.get(f"/api/posts/?cursor={cursor}")
+    assert res.status_code == 400
+    assert res.json() == {'detail': 'Invalid cursor'}
+
+
+def test_fulltext_search_matches_content(authorized_client: TestClient, test_posts):
+    """Test that full-text search looks at the content as well as the title."""
+    authorized_client.post("/api/posts/", json={"title": "Animals", "content": "A zebra crossed the road."})
+    res = authorized_client.get("/api/posts/?search=zebras&search_mode=fulltext")
+    assert res.status_code == 200
+    assert [post['Post']['title'] for post in res.json()] == ["Animals"]
+
+def test_fulltext_search_relevance_pages(authorized_client: TestClient, test_posts):
+    """Test paging through full-text results ordered by relevance."""
+    authorized_client.post("/api/posts/", json={"title": "Test post about tests", "content": "Test test test post."})
+    res = authorized_client.get("/api/posts/?search=test post&search_mode=fulltext&sort=relevance&limit=1")
+    titles = [post['Post']['title'] for post in res.json()]
+    assert titles == ["Test post about tests"]
+    cursor = res.headers.get("X-Next-Cursor")
+    while cursor:
+        res = authorized_client.get(f"/api/posts/?search=test post&search_mode=fulltext&sort=relevance&limit=1&cursor={cursor}")
+        titles += [post['Post']['title'] for post in res.json()]
+        cursor = res.headers.get("X-Next-Cursor")
+    assert sorted(titles) == sorted(["Test post about tests"] + [post.title for post in test_posts])
+
+@pytest.mark.parametrize("search_query, expected", [
+    ("ost Tw", ["Test Post Two"]),
+    ("POST THREE", ["Test Post Three"]),
+    ("post 2.", ["Test Post Two"]),
+    ("%", []),
+])
+def test_substring_search(authorized_client: TestClient, test_posts, search_query, expected):
+    """Test case-insensitive substring search over title and content."""
+    res = authorized_client.get("/api/posts/", params={"search": search_query, "search_mode": "substring"})
+    assert res.status_code == 200
+    assert [post['Post']['title'] for post in res.json()] == expected
+
+def test_substring_search_is_default(authorized_client: TestClient, test_posts):
+    """Test that searches match substrings unless full-text search is asked for."""
+    res = authorized_client.get("/api/posts/?search=ost Tw")
+    assert res.status_code == 200
+    assert [post['Post']['title'] for post in res.json()] == ["Test Post Two"]
+    res = authorized_client.get("/api/posts/?search=ost Tw&search_mode=fulltext")
+    assert res.json() == []
+
+def test_get_posts_include_author(authorized_client: TestClient, test_posts, session):
+    # Warm the auth caches so only the page itself is queried below
+    authorized_client.get("/api/posts/latest/recent")
+    # The test session is shared with the app, start from a clean identity map as a request would
+    session.expire_all()
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(session.get_bind(), "before_cursor_execute", count)
+    try:
+        res = authorized_client.get("/api/posts/?include=author")
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count)
+    assert res.status_code == 200
+    authors = {post.id: post.author_id for post in test_posts}
+    for post in res.json():
+        assert post["Post"]["author"]["id"] == authors[post["Post"]["id"]]
+    # Authors come with the page rather than one query per post
+    assert len(statements) == 1
+
+def test_get_posts_without_author(authorized_client: TestClient, test_posts):
+    res = authorized_client.get("/api/posts/")
+    assert res.status_code == 200
+    assert all(post["Post"]["author"] is None for post in res.json())
+
+def test_get_posts_not_added_to_session(authorized_client: TestClient, test_posts, session):
+    # Read-only lists come back as plain records, nothing is hydrated into the identity map
+    authorized_client.get("/api/posts/latest/recent")
+    session.expunge_all()
+    for url in ("/api/posts/?include=author", "/api/posts/user-posts", "/api/posts/latest/recent?include=author"):
+        res = authorized_client.get(url)
+        assert res.status_code == 200
+    assert len(session.identity_map) == 0
+
+def test_get_post_include_author(authorized_client: TestClient, test_posts, session):
+    res = authorized_client.get(f"/api/posts/{test_posts[0].id}")
+    assert res.json()["Post"]["author"] is None
+    session.expire_all()
+    res = authorized_client.get(f"/api/posts/{test_posts[0].id}?include=author")
+    assert res.json()["Post"]["author"]["id"] == test_posts[0].author_id
+
+def test_get_posts_invalid_include(authorized_client: TestClient):
+    res = authorized_client.get("/api/posts/?include=votes")
+    assert res.status_code == 422
+
+def test_export_posts(authorized_client: TestClient, test_posts):
+    res = authorized_client.get("/api/posts/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [line["id"] for line in lines] == sorted(post.id for post in test_posts)
+    assert all(line["votes"] == 0 for line in lines)
+
+def test_export_posts_filtered(authorized_client: TestClient, test_posts, test_user):
+    res = authorized_client.get(f"/api/posts/export?author_id={test_user['id']}")
+    ids = [json.loads(line)["id"] for line in res.text.splitlines()]
+    assert ids == sorted(post.id for post in test_posts if post.author_id == test_user['id'])
+    since = max(post.created_at for post in test_posts) + timedelta(seconds=1)
+    res = authorized_client.get("/api/posts/export", params={"since": since.isoformat()})
+    assert res.text == ""
+
+def test_unauthorised_user_export_posts(client: TestClient):
+    res = client.get("/api/posts/export")
+    assert res.status_code == 401
+
+def test_create_posts_batch(authorized_client: TestClient, test_posts, test_user, session):
+    payload = [
+        {"title": "Batch post one", "content": "First of the batch."},
+        {"title": test_posts[0].title, "content": "Title already taken."},
+        {"title": "Batch post two", "content": "Second of the batch."},
+        {"title": "Batch post one", "content": "Repeated within the batch."},
+    ]
+    res = authorized_client.post("/api/posts/batch", json=payload)
+    assert res.status_code == 201
+    data = res.json()
+    assert [post["title"] for post in data["created"]] == ["Batch post one", "Batch post two"]
+    assert all(post["author_id"] == test_user['id'] for post in data["created"])
+    assert [error["index"] for error in data["errors"]] == [1, 3]
+    res = authorized_client.get("/api/posts/")
+    assert len(res.json()) == len(test_posts) + 2
+
+def test_create_posts_batch_all_taken(authorized_client: TestClient, test_posts):
+    payload = [{"title": post.title, "content": "Title already taken."} for post in test_posts]
+    res = authorized_client.post("/api/posts/batch", json=payload)
+    assert res.status_code == 409
+    data = res.json()
+    assert data["created"] == []
+    assert [error["index"] for error in data["errors"]] == list(range(len(test_posts)))
+
+@pytest.mark.parametrize("payload", [[], [{"title": "Too", "content": "short title"}]])
+def test_create_posts_batch_invalid(authorized_client: TestClient, payload):
+    res = authorized_client.post("/api/posts/batch", json=payload)
+    assert res.status_code == 422
+
+def test_unauthorised_user_create_posts_batch(client: TestClient):
+    res = client.post("/api/posts/batch", json=[{"title": "Batch post", "content": "No token."}])
+    assert res.status_code == 401
+
+def test_lookup_posts(authorized_client: TestClient, test_posts):
+    ids = [test_posts[2].id, 99999999, test_posts[0].id, test_posts[2].id]
+    res = authorized_client.post("/api/posts/lookup", json={"ids": ids})
+    assert res.status_code == 200
+    data = res.json()
+    assert [post["Post"]["id"] for post in data["posts"]] == [test_posts[2].id, test_posts[0].id]
+    assert all(post["votes"] == 0 for post in data["posts"])
+    assert data["missing"] == [99999999]
+
+@pytest.mark.parametrize("ids", [[], list(range(501))])
+def test_lookup_posts_invalid(authorized_client: TestClient, ids):
+    res = authorized_client.post("/api/posts/lookup", json={"ids": ids})
+    assert res.status_code == 422
+
+def test_get_posts_summary_view(authorized_client: TestClient, test_posts, session):
+    authorized_client.get("/api/posts/latest/recent")
+    session.expire_all()
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(session.get_bind(), "before_cursor_execute", capture)
+    try:
+        res = authorized_client.get("/api/posts/?view=summary&include=author")
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", capture)
+    assert res.status_code == 200
+    contents = {post.id: post.content for post in test_posts}
+    for post in res.json():
+        assert "content" not in post["Post"]
+        assert post["Post"]["excerpt"] == contents[post["Post"]["id"]][:200]
+        assert post["Post"]["author"] is not None
+    # Only the excerpt is read, not the whole content column
+    assert len(statements) == 1
+    assert statements[0].count("posts.content") == 1
+    assert "left(posts.content" in statements[0]
+
+def test_get_my_posts_summary_view(authorized_client: TestClient, test_posts, test_user, session):
+    session.expire_all()
+    res = authorized_client.get("/api/posts/user-posts?view=summary")
+    assert res.status_code == 200
+    posts = res.json()
+    assert len(posts) == len([post for post in test_posts if post.author_id == test_user['id']])
+    assert all("content" not in post and post["excerpt"] for post in posts)
+    res = authorized_client.get("/api/posts/user-posts")
+    assert all("content" in post and "excerpt" not in post for post in res.json())
+
+def test_feed_voted_by_me(authorized_client: TestClient, test_posts, first_vote):
+    """Test that include=voted_by_me flags the posts the viewer voted on."""
+    res = authorized_client.get("/api/posts/?include=voted_by_me")
+    assert res.status_code == 200
+    flags = {post["Post"]["id"]: post["voted_by_me"] for post in res.json()}
+    assert flags == {post.id: post.id == first_vote.id for post in test_posts}
+    res = authorized_client.get(f"/api/posts/{first_vote.id}?include=voted_by_me")
+    assert res.json()["voted_by_me"] is True
+    res = authorized_client.post("/api/posts/lookup?include=voted_by_me", json={"ids": [first_vote.id]})
+    assert res.json()["posts"][0]["voted_by_me"] is True
+
+def test_feed_voted_by_me_per_viewer(authorized_client: TestClient, client: TestClient, test_posts, first_vote, test_user2):
+    """Test that a cached page flagging one viewer's votes is not served to another."""
+    authorized_client.get("/api/posts/?include=voted_by_me")
+    token = create_access_token({"user_id": test_user2['id']})
+    res = client.get("/api/posts/?include=voted_by_me", headers={"Authorization": f"Bearer {token}"})
+    assert not any(post["voted_by_me"] for post in res.json())
+
+def test_feed_without_voted_by_me(authorized_client: TestClient, test_posts, first_vote):
+    res = authorized_client.get("/api/posts/")
+    assert all(post["voted_by_me"] is None for post in res.json())
+
+def test_trending_posts(authorized_client: TestClient, test_posts, first_vote):
+    """Test that only voted posts trend, and that the ranking is built on first use."""
+    res = authorized_client.get("/api/posts/trending")
+    assert res.status_code == 200
+    assert [post["Post"]["id"] for post in res.json()] == [first_vote.id]
+    assert res.json()[0]["votes"] == 1
+
+def test_trending_ranking_decays_with_age(authorized_client: TestClient, session, test_posts, test_user):
+    """Test that a newer post with the same votes ranks above an older one."""
+    older, newer = sorted((post for post in test_posts if post.author_id != test_user['id']), key=lambda post: post.id)
+    older.created_at = newer.created_at - timedelta(days=1)
+    session.add(older)
+    session.commit()
+    for post in (older, newer):
+        authorized_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    res = authorized_client.get("/api/posts/trending?include=voted_by_me")
+    assert [post["Post"]["id"] for post in res.json()] == [newer.id, older.id]
+    assert all(post["voted_by_me"] for post in res.json())
+
+def test_trending_served_from_ranking(authorized_client: TestClient, test_posts, first_vote, test_user):
+    """Test that votes after the ranking was built wait for the next refresh."""
+    authorized_client.get("/api/posts/trending")
+    other = next(post for post in test_posts if post.author_id != test_user['id'] and post.id != first_vote.id)
+    authorized_client.post("/api/vote/", json={"post_id": other.id, "dir": 1})
+    res = authorized_client.get("/api/posts/trending")
+    assert [post["Post"]["id"] for post in res.json()] == [first_vote.id]
+
+def test_trending_rebuilt_once_when_stale(authorized_client: TestClient, test_posts, first_vote, monkeypatch):
+    """Test that while the ranking is being rebuilt, other requests serve the previous one."""
+    authorized_client.get("/api/posts/trending")
+    monkeypatch.setattr(trending, "refresh_seconds", 0)
+    assert trending.stale
+    with trending.refresh_lock:
+        res = authorized_client.get("/api/posts/trending")
+    assert [post["Post"]["id"] for post in res.json()] == [first_vote.id]
+    assert trending.stale
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_trending_invalid_limit(authorized_client: TestClient, limit):
+    res = authorized_client.get(f"/api/posts/trending?limit={limit}")
+    assert res.status_code == 422
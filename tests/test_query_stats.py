@@ -0,0 +1,55 @@
+import logging
+import re
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+from app.config import settings
+from app.utils.query_stats import QueryStatsMiddleware, instrument_engine, parameter_shape
+
+
+def test_server_timing_header(authorized_client: TestClient, test_posts, session: Session):
+    instrument_engine(session.get_bind())
+    res = authorized_client.get("/api/posts/")
+    assert res.status_code == 200
+    assert re.fullmatch(r'db;dur=\d+\.\d;desc="\d+ queries"', res.headers["server-timing"])
+
+def test_no_server_timing_without_queries(client: TestClient):
+    res = client.get("/")
+    assert "server-timing" not in res.headers
+
+def test_repeated_statement_logged(session: Session, monkeypatch, caplog):
+    engine = session.get_bind()
+    instrument_engine(engine)
+    monkeypatch.setattr(settings, "n_plus_one_threshold", 3)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items/{count}")
+    def items(count: int):
+        with engine.connect() as conn:
+            for id in range(count):
+                conn.execute(text("SELECT :id"), {"id": id})
+
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        assert client.get("/items/2").headers["server-timing"].endswith('desc="2 queries"')
+        assert "N+1" not in caplog.text
+        client.get("/items/3")
+    assert "Possible N+1 in GET /items/{count}: statement run 3 times" in caplog.text
+
+def test_slow_query_logged_without_values(session: Session, monkeypatch, caplog):
+    engine = session.get_bind()
+    instrument_engine(engine)
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+    assert "Slow query" in caplog.text
+    assert "{'secret': 'str'}" in caplog.text
+    assert "hunter2" not in caplog.text
+
+def test_parameter_shape():
+    assert parameter_shape({"id": 1, "title": "x"}) == {"id": "int", "title": "str"}
+    assert parameter_shape([{"id": 1}, {"id": 2}]) == "2 x {'id': 'int'}"
+    assert parameter_shape((1, None)) == ("int", "NoneType")
@@ -0,0 +1,96 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from starlette.datastructures import Headers
+from app import database
+from app.config import settings
+from app.utils.cache import feed_cache
+from app.utils.oauth2 import create_access_token
+from app.utils.read_your_writes import (
+    READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_HEADER, write_marker, written_recently,
+)
+from app.utils.pool_metrics import MeteredQueuePool
+from .conftest import DATABASE_URL
+
+
+@pytest.fixture(name="replica")
+def replica_engine(monkeypatch):
+    """Route read-only handlers to a read-only engine on the test database."""
+    engine = create_engine(DATABASE_URL, poolclass=MeteredQueuePool, execution_options={"postgresql_readonly": True})
+    monkeypatch.setattr(database, "replica_engines", [engine])
+    monkeypatch.setattr(settings, "db_replica_urls", [DATABASE_URL])
+    yield engine
+    engine.dispose()
+
+def test_reads_go_to_replica(authorized_client: TestClient, test_posts, replica):
+    res = authorized_client.get("/api/posts/")
+    assert res.status_code == 200
+    assert len(res.json()) == len(test_posts)
+    assert replica.pool.metrics()["checkouts"] == 1
+
+def test_writes_stay_on_primary(authorized_client: TestClient, replica):
+    res = authorized_client.post("/api/posts/", json={"title": "Primary post", "content": "Written to the primary."})
+    assert res.status_code == 201
+    assert replica.pool.metrics()["checkouts"] == 0
+
+def test_read_your_writes_window(authorized_client: TestClient, test_posts, replica):
+    res = authorized_client.post("/api/posts/", json={"title": "Fresh post", "content": "Read it back."})
+    assert res.status_code == 201
+    assert READ_YOUR_WRITES_COOKIE in res.cookies
+    # The client keeps the cookie, the next read goes to the primary whichever worker serves it
+    res = authorized_client.get("/api/posts/")
+    assert res.status_code == 200
+    assert "Fresh post" in res.text
+    assert replica.pool.metrics()["checkouts"] == 0
+
+def test_read_your_writes_header(client: TestClient, test_posts, test_user, test_user2, replica):
+    marker = write_marker(test_user["id"], int((time.time() + 5) * 1000))
+    # Keyed on the user: a token issued after the write still reads from the primary
+    token = create_access_token({"user_id": test_user["id"], "refreshed": True})
+    res = client.get("/api/posts/", headers={"Authorization": f"Bearer {token}", READ_YOUR_WRITES_HEADER: marker})
+    assert res.status_code == 200
+    assert replica.pool.metrics()["checkouts"] == 0
+    # Someone else's marker changes nothing
+    other = create_access_token({"user_id": test_user2["id"]})
+    client.get("/api/posts/", headers={"Authorization": f"Bearer {other}", READ_YOUR_WRITES_HEADER: marker})
+    assert replica.pool.metrics()["checkouts"] == 1
+
+def test_reads_without_commit_get_no_marker(authorized_client: TestClient, test_posts, replica):
+    res = authorized_client.get("/api/posts/")
+    assert READ_YOUR_WRITES_HEADER not in res.headers
+    assert READ_YOUR_WRITES_COOKIE not in res.cookies
+
+@pytest.mark.parametrize("marker", [
+    lambda user_id: write_marker(user_id, int((time.time() - 1) * 1000)),
+    lambda user_id: write_marker(user_id, int((time.time() + 5) * 1000))[:-1] + "0",
+    lambda user_id: write_marker(user_id + 1, int((time.time() + 5) * 1000)),
+    lambda user_id: "garbage",
+])
+def test_invalid_markers_ignored(marker):
+    token = create_access_token({"user_id": 1})
+    headers = Headers({"Authorization": f"Bearer {token}", READ_YOUR_WRITES_HEADER: marker(1)})
+    assert not written_recently(headers, {})
+    valid = write_marker(1, int((time.time() + 5) * 1000))
+    assert written_recently(Headers({"Authorization": f"Bearer {token}"}), {READ_YOUR_WRITES_COOKIE: valid})
+
+@pytest.mark.parametrize("url", ["/api/posts/", "/api/posts/latest/recent"])
+def test_writer_skips_other_workers_feed_cache(authorized_client: TestClient, test_posts, replica, monkeypatch, url):
+    # Warm the cache from the primary, as a worker that has not seen the write would have it
+    monkeypatch.setattr(database, "replica_engines", [])
+    authorized_client.get(url)
+    stale = dict(feed_cache._data)
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    res = authorized_client.post("/api/posts/", json={"title": "Own post", "content": "Must be visible."})
+    assert res.status_code == 201
+    feed_cache._data.update(stale)
+    # Within the window the page is read from the primary, not from the stale cache
+    res = authorized_client.get(url)
+    assert "Own post" in res.text
+    assert feed_cache._data.keys() == stale.keys()
+
+def test_replica_pages_not_cached(authorized_client: TestClient, test_posts, replica):
+    authorized_client.get("/api/posts/")
+    assert len(feed_cache) == 0
+    authorized_client.get("/api/posts/")
+    assert replica.pool.metrics()["checkouts"] == 2
@@ -5,6 +5,7 @@ from app.config import settings
 from jose import jwt
 import pytest 
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
 
 # Uncomment the following test if you want to test the root endpoint
@@ -94,4 +95,43 @@ def test_invalid_credentials(client: TestClient, test_user: dict, email, passwor
     )
 
     assert response.status_code == status_code
-    # assert response.json() == {'detail': 'Invalid credentials'}
\ No newline at end of file
+    # assert response.json() == {'detail': 'Invalid credentials'}
+
+
+def test_get_users_paginated(client: TestClient, test_posts, test_user, test_user2):
+    """Test listing users a page at a time with a bounded number of posts each."""
+    response = client.get("api/users/?limit=1&posts_limit=1")
+    assert response.status_code == 200
+    users = response.json()
+    assert [user["id"] for user in users] == [test_user["id"]]
+    assert users[0]["post_count"] == 2
+    assert len(users[0]["posts"]) == 1
+    assert users[0]["posts"][0]["id"] == max(post.id for post in test_posts if post.author_id == test_user["id"])
+
+    response = client.get(f"api/users/?limit=1&posts_limit=1&cursor={response.headers['X-Next-Cursor']}")
+    assert [user["id"] for user in response.json()] == [test_user2["id"]]
+
+    response = client.get(f"api/users/?limit=1&cursor={response.headers['X-Next-Cursor']}")
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_users_constant_queries(client: TestClient, test_posts, session):
+    """Test that the listing does the same two queries however many users and posts there are."""
+    session.expire_all()
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(session.get_bind(), "before_cursor_execute", count)
+    try:
+        response = client.get("api/users/")
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count)
+    assert response.status_code == 200
+    assert sum(user["post_count"] for user in response.json()) == len(test_posts)
+    assert len(statements) == 2
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1", "limit=101", "posts_limit=-1", "posts_limit=51"])
+def test_get_users_invalid_limits(client: TestClient, query):
+    """Test that out of range page sizes are rejected rather than passed to the database."""
+    response = client.get(f"api/users/?{query}")
+    assert response.status_code == 422
@@ -1,18 +1,6 @@
 from fastapi.testclient import TestClient
-import pytest
-
-@pytest.fixture(name="first_vote")
-def fixture_first_vote(authorized_client: TestClient, test_posts, test_user):
-    """Fixture to create a vote for the first post."""
-    post = next((post for post in test_posts if post.author_id != test_user['id']), None)
-    assert post is not None, "No post found for voting"
-    assert post.id is not None, "Post ID is None"
-    payload = {
-        "post_id": post.id,
-        "dir": 1
-    }
-    authorized_client.post("/api/vote/", json=payload)
-    return post
+from sqlmodel import select
+from app.models.votes import Vote
 
 def test_vote_on_others_post(authorized_client: TestClient, test_posts, test_user):
     """Test voting on a post."""
@@ -134,4 +122,35 @@ def test_vote_unauthorized_user_vote(client: TestClient, test_posts):
     }
     res = client.post("/api/vote/", json=payload)
     assert res.status_code == 401
-    assert res.json() == {'detail': 'Not authenticated'}
\ No newline at end of file
+    assert res.json() == {'detail': 'Not authenticated'}
+
+def test_vote_count_follows_votes(authorized_client: TestClient, first_vote):
+    """Test that the denormalized vote count tracks upvotes and downvotes."""
+    res = authorized_client.get(f"/api/posts/{first_vote.id}/")
+    assert res.json()['votes'] == 1
+    authorized_client.post("/api/vote/", json={"post_id": first_vote.id, "dir": 0})
+    res = authorized_client.get(f"/api/posts/{first_vote.id}/")
+    assert res.json()['votes'] == 0
+
+def test_deleting_voter_updates_vote_count(authorized_client: TestClient, session, first_vote, test_user):
+    """Test that deleting a user takes their votes out of the counts."""
+    res = authorized_client.delete(f"/api/users/{test_user['id']}/")
+    assert res.status_code == 204
+    session.refresh(first_vote)
+    assert first_vote.vote_count == 0
+
+def test_vote_returns_new_count(authorized_client: TestClient, test_posts, test_user):
+    """Test that voting responds with the post's updated vote count."""
+    post = next(post for post in test_posts if post.author_id != test_user['id'])
+    res = authorized_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    assert res.json()['votes'] == 1
+    res = authorized_client.post("/api/vote/", json={"post_id": post.id, "dir": 0})
+    assert res.json()['votes'] == 0
+
+def test_vote_on_own_post_not_recorded(authorized_client: TestClient, session, test_posts, test_user):
+    """Test that the author check in the vote statement leaves no vote behind."""
+    post = next(post for post in test_posts if post.author_id == test_user['id'])
+    authorized_client.post("/api/vote/", json={"post_id": post.id, "dir": 1})
+    assert session.exec(select(Vote).where(Vote.post_id == post.id)).first() is None
+    session.refresh(post)
+    assert post.vote_count == 0